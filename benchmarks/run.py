@@ -0,0 +1,127 @@
+"""
+Times pyrcos on synthetic data and prints the results as JSON.
+
+    python -m benchmarks.run --points 1000 100000 --chromosomes 1 100 --output results.json
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+import pyrcos
+from pyrcos.datasets.protein_abundance import read_paxdb
+from pyrcos.datasets.regulatory_network import parse_regulondb
+from pyrcos.datasets.tn_seq import parse_essentials
+from pyrcos.objects import Circos, Histogram, Link, Tile
+from pyrcos.tracks import TrackStore
+from pyrcos.utils import seq_record_to_tiles
+
+from benchmarks import synthetic
+
+STUB_CIRCOS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "stub_circos")
+
+
+def measure(function, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def serialise(directory, track):
+    file = TrackStore(directory).add(track)
+    file.materialize()
+    file.release()
+
+
+def _figure(points, chromosomes, plots, rules):
+    karyotype = synthetic.karyotype(chromosomes)
+    histograms = [Histogram(synthetic.histogram_track(points, chromosomes, seed=i), 0.5, 0.6,
+                            rules=synthetic.rules(rules)) for i in range(plots)]
+    tiles = Tile(synthetic.tile_track(points, chromosomes), 0.7, 0.8)
+    links = Link(synthetic.link_track(max(1, points // 10), chromosomes))
+    return Circos(karyotype, plots=histograms + [tiles], links=[links], circos_path=STUB_CIRCOS)
+
+
+def run(points, chromosomes, plots=10, rules=10, repeat=3):
+    directory = tempfile.mkdtemp(prefix="pyrcos-benchmarks-")
+    results = []
+
+    def record(name, function, **parameters):
+        times = measure(function, repeat)
+        results.append(dict(name=name, parameters=parameters, best=min(times), times=times))
+        sys.stderr.write("%-32s %-48s %.4fs\n" % (name, json.dumps(parameters, sort_keys=True), min(times)))
+
+    try:
+        with TrackStore(os.path.join(directory, "tracks")):
+            for n in points:
+                for c in chromosomes:
+                    parameters = dict(points=n, chromosomes=c)
+                    if n == points[0]:
+                        record("karyotype_serialisation", lambda: str(synthetic.karyotype(c)), chromosomes=c)
+                    track = synthetic.histogram_track(n, c)
+                    record("track_serialisation", lambda: serialise(os.path.join(directory, "serialise"), track),
+                           **parameters)
+
+                    figure = _figure(n, c, plots, rules)
+
+                    def render():
+                        # cold rendering, every cached block is dropped
+                        for plot in figure.plots:
+                            for rule in plot.rules:
+                                rule.invalidate()
+                            plot.invalidate()
+                        return figure.configuration
+
+                    record("configuration_rendering", render, plots=plots + 1, rules=rules, **parameters)
+                    output = os.path.join(directory, "figure.svg")
+                    record("circos_save", lambda: figure.save(output), **parameters)
+
+                    records = synthetic.seq_records(n, c)
+                    record("seq_record_to_tiles", lambda: list(seq_record_to_tiles(records, ["gene", "CDS"])),
+                           **parameters)
+
+                genes = max(10, n // 10)
+                sources = synthetic.regulondb_files(directory, genes, n)
+                record("parse_regulondb", lambda: parse_regulondb(*sources), genes=genes, interactions=n)
+                paxdb = synthetic.paxdb_file(directory, n)
+                record("read_paxdb", lambda: read_paxdb(paxdb), proteins=n)
+                essentials, samples = synthetic.essentials_file(directory, n)
+                record("parse_essentials", lambda: list(parse_essentials(essentials, samples)), positions=n,
+                       samples=len(samples))
+    finally:
+        shutil.rmtree(directory)
+
+    return dict(pyrcos=pyrcos.__version__, python=platform.python_version(), platform=platform.platform(),
+                repeat=repeat, results=results)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--points", type=int, nargs="+", default=[1000, 100000],
+                        help="number of points per track (1e3 to 1e7)")
+    parser.add_argument("--chromosomes", type=int, nargs="+", default=[1, 100],
+                        help="number of chromosomes (1 to 10k)")
+    parser.add_argument("--plots", type=int, default=10, help="number of histogram plots per figure")
+    parser.add_argument("--rules", type=int, default=10, help="number of rules per plot")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="write the JSON results to this file instead of stdout")
+    args = parser.parse_args(argv)
+
+    results = run(args.points, args.chromosomes, plots=args.plots, rules=args.rules, repeat=args.repeat)
+    if args.output is None:
+        json.dump(results, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    else:
+        with open(args.output, "w") as fw:
+            json.dump(results, fw, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Synthetic genomes and tracks for the benchmarks.
+"""
+import os
+
+import numpy as np
+from Bio.Seq import Seq
+from Bio.SeqFeature import SeqFeature, FeatureLocation
+from Bio.SeqRecord import SeqRecord
+from pandas import DataFrame
+
+from pyrcos.objects import Karyotype, Rule
+from pyrcos.functions import var
+
+
+def karyotype(chromosomes, length=1000000):
+    ids = np.array(["chr%i" % i for i in range(chromosomes)])
+    return Karyotype.from_arrays(ids, ids, np.zeros(chromosomes, dtype=np.int64),
+                                 np.full(chromosomes, length, dtype=np.int64), np.full(chromosomes, "grey"))
+
+
+def _positions(points, chromosomes, length, seed):
+    random = np.random.RandomState(seed)
+    ids = np.array(["chr%i" % i for i in range(chromosomes)])
+    chromosome = ids[random.randint(0, chromosomes, points)]
+    starts = random.randint(0, length - 1000, points)
+    return random, chromosome, starts
+
+
+def tile_track(points, chromosomes=1, length=1000000, seed=0):
+    random, chromosome, starts = _positions(points, chromosomes, length, seed)
+    return DataFrame(dict(chromosome=chromosome, start=starts, end=starts + random.randint(100, 1000, points)),
+                     columns=["chromosome", "start", "end"])
+
+
+def histogram_track(points, chromosomes=1, length=1000000, seed=0):
+    random, chromosome, starts = _positions(points, chromosomes, length, seed)
+    return DataFrame(dict(chromosome=chromosome, start=starts, end=starts + 1, value=random.random_sample(points)),
+                     columns=["chromosome", "start", "end", "value"])
+
+
+def link_track(links, chromosomes=1, length=1000000, seed=0):
+    random, chromosome1, starts1 = _positions(links, chromosomes, length, seed)
+    _, chromosome2, starts2 = _positions(links, chromosomes, length, seed + 1)
+    return DataFrame(dict(chromosome1=chromosome1, start1=starts1, end1=starts1 + 100,
+                          chromosome2=chromosome2, start2=starts2, end2=starts2 + 100),
+                     columns=["chromosome1", "start1", "end1", "chromosome2", "start2", "end2"])
+
+
+def rules(count):
+    colors = ["red", "green", "blue", "orange"]
+    return [Rule(condition="%s > %f" % (var("value"), i / float(count)), color=colors[i % len(colors)])
+            for i in range(count)]
+
+
+def seq_records(features, chromosomes=1, length=1000000, seed=0):
+    random, chromosome, starts = _positions(features, chromosomes, length, seed)
+    order = np.lexsort((starts, chromosome))
+    types = np.array(["gene", "CDS", "tRNA", "rRNA"])[random.randint(0, 4, features)]
+    per_chromosome = {}
+    for i in order:
+        per_chromosome.setdefault(chromosome[i], []).append(
+            SeqFeature(FeatureLocation(int(starts[i]), int(starts[i]) + 500), type=types[i]))
+
+    return [SeqRecord(Seq("N" * 10), id="chr%i" % i, name="chr%i" % i, features=per_chromosome.get("chr%i" % i, []))
+            for i in range(chromosomes)]
+
+
+def regulondb_files(directory, genes, interactions, seed=0):
+    random = np.random.RandomState(seed)
+    paths = [os.path.join(directory, name) for name in ("genes.txt", "tfs.txt", "network.txt")]
+    with open(paths[0], "w") as fw:
+        for i in range(genes):
+            fw.write("G%i\tgene%i\tb%i\t%i\t%i\t\n" % (i, i, i, i * 1000, i * 1000 + 900))
+
+    tf_count = max(1, genes // 20)
+    with open(paths[1], "w") as fw:
+        for i in range(tf_count):
+            fw.write("T%i\tTF%i\tgene%i\n" % (i, i, i))
+
+    with open(paths[2], "w") as fw:
+        for tf, target, regulation in zip(random.randint(0, tf_count, interactions),
+                                          random.randint(0, genes, interactions),
+                                          random.randint(0, 3, interactions)):
+            fw.write("TF%i\tgene%i\t%s\tevidence\n" % (tf, target, ["+", "-", "+-"][regulation]))
+    return paths
+
+
+def paxdb_file(directory, proteins, seed=0):
+    random = np.random.RandomState(seed)
+    path = os.path.join(directory, "paxdb.txt")
+    with open(path, "w") as fw:
+        fw.write("#name: synthetic\n")
+        for i, abundance in enumerate(random.lognormal(3, 1, proteins)):
+            fw.write("%i\t4932.b%i\t%f\n" % (i, i, abundance))
+    return path
+
+
+def essentials_file(directory, positions, samples=4, seed=0):
+    random = np.random.RandomState(seed)
+    path = os.path.join(directory, "essentials.tsv")
+    names = ["S%i" % i for i in range(samples)]
+    data = DataFrame(random.poisson(5, (positions, samples)), columns=names)
+    data.insert(0, "Position", np.sort(random.randint(0, positions, positions)))
+    data.to_csv(path, sep="\t", index=False)
+    return path, names
@@ -0,0 +1,116 @@
+import asyncio
+import contextlib
+import contextvars
+import os
+import time
+
+from pyrcos.cmd import RenderResult, _command, _remove_output, _write_config, output_path, workspace
+
+
+async def _lines(configuration, output_file, circos_path, format, state):
+    config = _write_config(configuration)
+    process = None
+    stderr = None
+    finished = False
+    try:
+        process = await asyncio.create_subprocess_exec(*_command(config.name, output_file, circos_path, format),
+                                                       stdout=asyncio.subprocess.PIPE,
+                                                       stderr=asyncio.subprocess.PIPE)
+        # stderr is drained concurrently so circos never blocks on a full pipe
+        stderr = asyncio.ensure_future(process.stderr.read())
+        async for line in process.stdout:
+            yield line.decode("utf-8", "replace").rstrip("\r\n")
+
+        state["stderr"] = (await stderr).decode("utf-8", "replace")
+        state["returncode"] = await process.wait()
+        finished = True
+        if state["returncode"] != 0:
+            raise RuntimeError("circos exited with status %i: %s" % (state["returncode"], state["stderr"].strip()))
+    finally:
+        if not finished:
+            if process is not None and process.returncode is None:
+                process.kill()
+                await process.wait()
+            if stderr is not None:
+                stderr.cancel()
+            path = output_path(output_file, format)
+            if os.path.exists(path):
+                os.remove(path)
+        config.close()
+
+
+def _in_executor(function, *args):
+    # blocking work runs in the default executor with the context of the task (e.g. the active TrackStore)
+    context = contextvars.copy_context()
+    return asyncio.get_running_loop().run_in_executor(None, lambda: context.run(function, *args))
+
+
+@contextlib.asynccontextmanager
+async def _workspace(circos_object):
+    # writing (and removing) the data files is blocking work, it runs in the default executor
+    context = workspace(circos_object)
+    await _in_executor(context.__enter__)
+    try:
+        yield
+    finally:
+        await _in_executor(context.__exit__, None, None, None)
+
+
+async def circos_lines(circos_object, output_file, circos_path=None, format="png"):
+    """
+    Runs circos and iterates asynchronously over the lines it prints, to report progress.
+
+    Raises RuntimeError at the end if circos fails. Closing the iterator early, or cancelling the task consuming
+    it, kills circos and removes the configuration and the partial output.
+    """
+    circos_path = getattr(circos_object, "circos_path", None) or circos_path
+    async with _workspace(circos_object):
+        configuration = await _in_executor(str, circos_object)
+        lines = _lines(configuration, output_file, circos_path, format, {})
+        try:
+            async for line in lines:
+                yield line
+        finally:
+            await lines.aclose()
+
+
+async def circos_async(circos_object, output_file=None, circos_path=None, format="png", cache=None,
+                       progress=None):
+    """
+    asyncio variant of pyrcos.cmd.circos.
+
+    Arguments
+    =========
+    progress :
+        optional callable receiving every line circos prints
+
+    Returns
+    =======
+    RenderResult
+    """
+    circos_path = getattr(circos_object, "circos_path", None) or circos_path
+    async with _workspace(circos_object):
+        # rendering the configuration and hashing the data files for the cache key block, they run in the executor
+        configuration = await _in_executor(str, circos_object)
+        start = time.time()
+        if cache is not None:
+            key = await _in_executor(cache.key, configuration)
+            if await _in_executor(cache.fetch, key, output_file, format):
+                return RenderResult(output_file, 0, "", "", time.time() - start, False, True)
+            _remove_output(output_file, format)
+
+        state = {}
+        stdout = []
+        lines = _lines(configuration, output_file, circos_path, format, state)
+        try:
+            async for line in lines:
+                stdout.append(line)
+                if progress is not None:
+                    progress(line)
+        finally:
+            await lines.aclose()
+
+    if cache is not None:
+        await _in_executor(cache.store, key, output_file, format)
+    return RenderResult(output_file, state["returncode"], "\n".join(stdout), state["stderr"], time.time() - start,
+                        False, False)
@@ -0,0 +1,170 @@
+from math import ceil, pi
+
+import numpy as np
+from pandas import DataFrame
+
+AGGREGATIONS = ("mean", "max", "min", "sum")
+
+
+def karyotype_length(karyotypes):
+    """
+    Total length of the chromosomes of one or many karyotypes.
+    """
+    if not isinstance(karyotypes, (list, tuple)):
+        karyotypes = [karyotypes]
+    total = 0
+    for karyotype in karyotypes:
+        chromosomes = karyotype.chromosomes
+        total += int(np.sum(karyotype.stops[chromosomes] - karyotype.starts[chromosomes]))
+    return total
+
+
+def bin_size(karyotypes, radius, pixels_per_bin=1):
+    """
+    Number of bases per bin so that a track drawn at radius (in pixels) gets one bin every pixels_per_bin pixels.
+    """
+    circumference = 2 * pi * radius
+    return max(1, int(ceil(karyotype_length(karyotypes) * pixels_per_bin / circumference)))
+
+
+def _group(data, size):
+    chromosomes = np.asarray(data.iloc[:, 0]).astype(str)
+    starts = np.asarray(data.iloc[:, 1], dtype=np.int64)
+    ends = np.asarray(data.iloc[:, 2], dtype=np.int64)
+    values = np.asarray(data.iloc[:, 3], dtype=float)
+
+    names, codes = np.unique(chromosomes, return_inverse=True)
+    bins = starts // size
+    keys = codes.astype(np.int64) * (int(bins.max()) + 1 if len(bins) > 0 else 1) + bins
+    order = np.argsort(keys, kind="stable")
+    keys = keys[order]
+    values = values[order]
+    first = np.concatenate([[0], np.flatnonzero(np.diff(keys)) + 1]) if len(keys) > 0 else np.array([], dtype=int)
+
+    # the last bin of a chromosome ends with its data rather than past the end of the chromosome
+    codes, bins = codes[order][first], bins[order][first]
+    stops = bins * size + size - 1
+    last = np.append(codes[1:] != codes[:-1], True) if len(codes) > 0 else np.array([], dtype=bool)
+    stops[last] = np.minimum(stops[last], _reduce(np.maximum, ends[order], first)[last])
+    return names[codes], bins, stops, values, first
+
+
+def _table(chromosomes, bins, stops, size, **columns):
+    table = DataFrame(dict(chromosome=chromosomes, start=bins * size, end=stops))
+    for name, column in columns.items():
+        table[name] = column
+    return table
+
+
+def _aggregate(values, first, how):
+    if len(first) == 0:
+        return np.array([], dtype=float)
+    if how == "sum":
+        return np.add.reduceat(values, first)
+    elif how == "mean":
+        counts = np.diff(np.concatenate([first, [len(values)]]))
+        return np.add.reduceat(values, first) / counts
+    elif how == "max":
+        return np.maximum.reduceat(values, first)
+    elif how == "min":
+        return np.minimum.reduceat(values, first)
+    raise ValueError("Unknown aggregation %s, use one of %s" % (how, ", ".join(AGGREGATIONS)))
+
+
+def bin_track(data, size, how="mean"):
+    """
+    Aggregates the values of a track in bins of size bases per chromosome.
+
+    Arguments
+    =========
+    data :
+        DataFrame with chromosome, start, end and value as its first columns
+    size :
+        bin size in bases
+    how :
+        mean, max, min or sum
+
+    Returns
+    =======
+    DataFrame
+        chromosome, start, end and value of every non empty bin, the last bin of each chromosome ends at the end of
+        its data
+    """
+    chromosomes, bins, stops, values, first = _group(data, size)
+    return _table(chromosomes, bins, stops, size, value=_aggregate(values, first, how))
+
+
+def bin_envelope(data, size):
+    """
+    Minimum and maximum of the values in each bin, returned as two tracks (e.g. for two Line plots).
+    """
+    chromosomes, bins, stops, values, first = _group(data, size)
+    return (_table(chromosomes, bins, stops, size, value=_aggregate(values, first, "min")),
+            _table(chromosomes, bins, stops, size, value=_aggregate(values, first, "max")))
+
+
+def _runs(groups, starts, ends, max_gap):
+    # intervals sorted by group and start, a run starts when the group changes or when the start is more than
+    # max_gap past every end seen so far in the group
+    if len(starts) == 0:
+        return np.array([], dtype=bool)
+    offset = int(ends.min())
+    span = int(ends.max()) - offset + 1
+    reached = np.maximum.accumulate(groups * span + (ends - offset)) - groups * span + offset
+    breaks = np.empty(len(starts), dtype=bool)
+    breaks[0] = True
+    breaks[1:] = (groups[1:] != groups[:-1]) | (starts[1:] > reached[:-1] + max_gap)
+    return breaks
+
+
+def _reduce(ufunc, values, first):
+    return ufunc.reduceat(values, first) if len(first) > 0 else values[:0]
+
+
+def bundle_links(data, max_gap, min_links=1):
+    """
+    Merges links whose ends are both within max_gap bases of another link of the bundle into ribbons, as the
+    circos bundlelinks tool does.
+
+    Arguments
+    =========
+    data :
+        DataFrame with chromosome1, start1, end1, chromosome2, start2, end2 and optionally options as its columns
+    max_gap :
+        largest distance in bases between the ends of two links of a bundle
+    min_links :
+        drop the bundles with fewer links than this
+
+    Returns
+    =======
+    DataFrame
+        chromosome1, start1, end1, chromosome2, start2, end2 and options of every bundle, the options of its first
+        link are kept and nlinks=N is added
+    """
+    chromosomes1 = np.asarray(data.iloc[:, 0]).astype(str)
+    chromosomes2 = np.asarray(data.iloc[:, 3]).astype(str)
+    starts1, ends1, starts2, ends2 = [np.asarray(data.iloc[:, i], dtype=np.int64) for i in (1, 2, 4, 5)]
+
+    names1, codes1 = np.unique(chromosomes1, return_inverse=True)
+    names2, codes2 = np.unique(chromosomes2, return_inverse=True)
+    pairs = codes1.astype(np.int64) * len(names2) + codes2
+
+    # chain the links along their first ends, then split each chain along the second ends
+    order = np.lexsort((starts1, pairs))
+    chains = np.cumsum(_runs(pairs[order], starts1[order], ends1[order], max_gap)) - 1
+    within = np.lexsort((starts2[order], chains))
+    order, chains = order[within], chains[within]
+    first = np.flatnonzero(_runs(chains, starts2[order], ends2[order], max_gap))
+
+    counts = np.diff(np.concatenate([first, [len(order)]]))
+    keep = counts >= min_links
+    starts1, starts2 = [_reduce(np.minimum, values[order], first)[keep] for values in (starts1, starts2)]
+    ends1, ends2 = [_reduce(np.maximum, values[order], first)[keep] for values in (ends1, ends2)]
+    counts, links = counts[keep], order[first[keep]]
+
+    options = np.char.add("nlinks=", counts.astype(str))
+    if data.shape[1] > 6:
+        options = np.char.add(np.char.add(np.asarray(data.iloc[:, 6]).astype(str)[links], ","), options)
+    return DataFrame(dict(chromosome1=chromosomes1[links], start1=starts1, end1=ends1,
+                          chromosome2=chromosomes2[links], start2=starts2, end2=ends2, options=options),
+                     columns=["chromosome1", "start1", "end1", "chromosome2", "start2", "end2", "options"])
@@ -0,0 +1,121 @@
+import hashlib
+import os
+import re
+import shutil
+
+from pyrcos.cmd import output_path
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "pyrcos", "render")
+
+_FILE_REGEX = re.compile(r"^(\s*(?:file|karyotype)\s*=\s*)(.+?)\s*$", re.MULTILINE)
+
+
+def file_hash(path, block_size=1 << 20):
+    digest = hashlib.sha1()
+    with open(path, "rb") as fr:
+        block = fr.read(block_size)
+        while block:
+            digest.update(block)
+            block = fr.read(block_size)
+    return digest.hexdigest()
+
+
+def referenced_files(configuration):
+    """
+    Lists the data and karyotype files referenced by a circos configuration.
+    """
+    files = []
+    for match in _FILE_REGEX.finditer(configuration):
+        files.extend(path.strip() for path in match.group(2).split(","))
+    return files
+
+
+def configuration_key(configuration):
+    """
+    Hash of a circos configuration where every referenced file path is replaced by the hash of its content,
+    so the same figure built from different temporary files gets the same key.
+    """
+    hashes = {}
+
+    def _hash(path):
+        if path not in hashes:
+            hashes[path] = file_hash(path) if os.path.isfile(path) else path
+        return hashes[path]
+
+    def _normalize(match):
+        return match.group(1) + ",".join(_hash(path.strip()) for path in match.group(2).split(","))
+
+    normalized = _FILE_REGEX.sub(_normalize, configuration)
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+
+def _link_or_copy(source, destination):
+    if os.path.exists(destination):
+        os.remove(destination)
+    try:
+        os.link(source, destination)
+    except OSError:
+        shutil.copyfile(source, destination)
+
+
+class RenderCache(object):
+    """
+    On-disk cache of rendered images keyed by configuration_key.
+
+    Arguments
+    =========
+    directory :
+        where the cached images are kept (defaults to ~/.cache/pyrcos/render)
+    max_size :
+        maximum size of the cache in bytes, the least recently used images are evicted beyond it
+    """
+
+    def __init__(self, directory=None, max_size=1 << 30):
+        self.directory = directory if directory is not None else DEFAULT_CACHE_DIR
+        self.max_size = max_size
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+
+    def key(self, configuration):
+        return configuration_key(str(configuration))
+
+    def path(self, key, format="png"):
+        return os.path.join(self.directory, "%s.%s" % (key, format))
+
+    def fetch(self, key, output_file, format="png"):
+        cached = self.path(key, format)
+        if not os.path.isfile(cached):
+            return False
+
+        _link_or_copy(cached, output_path(output_file, format))
+        os.utime(cached, None)
+        return True
+
+    def store(self, key, output_file, format="png"):
+        rendered = output_path(output_file, format)
+        if not os.path.isfile(rendered):
+            return
+
+        _link_or_copy(rendered, self.path(key, format))
+        self.evict()
+
+    def size(self):
+        return sum(os.path.getsize(os.path.join(self.directory, name)) for name in os.listdir(self.directory))
+
+    def evict(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            stat = os.stat(path)
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_size:
+                break
+            os.remove(path)
+            total -= size
+
+    def clear(self):
+        for name in os.listdir(self.directory):
+            os.remove(os.path.join(self.directory, name))
@@ -1,19 +1,202 @@
+import contextlib
+import contextvars
 import os
+import subprocess
 import tempfile
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 
+from pyrcos.profiling import phase
 
-def circos(circos_object, output_file=None, circos_path=None, format="png"):
-    cmd = os.path.join(circos_path, "bin", "circos")
-    config = tempfile.NamedTemporaryFile()
-    conf = str(circos_object)
-    config.write(conf)
-    config.flush()
+
+class RenderResult(namedtuple("RenderResult", ["output_file", "returncode", "stdout", "stderr", "elapsed",
+                                               "timed_out", "cached"])):
+    """
+    Outcome of a single circos run.
+
+    Arguments
+    =========
+    output_file :
+        the requested output file
+    returncode :
+        exit status of circos (None if it timed out)
+    stdout, stderr :
+        captured output of circos
+    elapsed :
+        wall time in seconds
+    timed_out :
+        whether the process was killed after the timeout
+    cached :
+        whether the image was taken from a RenderCache instead of running circos
+    """
+
+    @property
+    def ok(self):
+        return self.returncode == 0 and not self.timed_out
+
+
+def _executable(circos_path):
+    if circos_path is None:
+        return "circos"
+    return os.path.join(circos_path, "bin", "circos")
+
+
+def output_path(output_file, format="png"):
+    """
+    Path of the image circos writes for output_file, circos replaces (or adds) the png/svg extension.
+    """
+    root, extension = os.path.splitext(output_file)
+    if extension.lower() not in (".png", ".svg"):
+        root = output_file
+    return "%s.%s" % (root, format)
+
+
+def _remove_output(output_file, format):
+    # the output may be a hard link into a render cache, circos must not write through it
+    path = output_path(output_file, format)
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def _command(config_file, output_file, circos_path=None, format="png"):
     split = output_file.split(os.sep)
     output_file = split[-1]
     output_dir = os.sep.join(split[0:-1])
     if len(output_dir) == 0:
         output_dir = "."
 
-    cmd += " -config %s -%s -dir %s -file %s" % (config.name, format, output_dir, output_file)
-    if os.system(cmd) != 0:
-        raise RuntimeError
\ No newline at end of file
+    return [_executable(circos_path), "-config", config_file, "-%s" % format, "-dir", output_dir, "-file", output_file]
+
+
+def _write_config(configuration):
+    config = tempfile.NamedTemporaryFile("w+", suffix=".conf")
+    config.write(configuration)
+    config.flush()
+    return config
+
+
+def workspace(circos_object):
+    """
+    The workspace of the object (see Circos.workspace), data files exist on disk inside it.
+    """
+    workspace = getattr(circos_object, "workspace", None)
+    return workspace() if workspace is not None else contextlib.nullcontext()
+
+
+def circos(circos_object, output_file=None, circos_path=None, format="png", cache=None):
+    with workspace(circos_object):
+        _circos(circos_object, output_file, circos_path, format, cache)
+
+
+def _circos(circos_object, output_file, circos_path, format, cache):
+    with phase("configuration", output_file):
+        configuration = str(circos_object)
+    if cache is not None:
+        with phase("cache", output_file):
+            key = cache.key(configuration)
+            if cache.fetch(key, output_file, format):
+                return
+        _remove_output(output_file, format)
+
+    config = _write_config(configuration)
+    try:
+        with phase("circos", output_file) as measure:
+            returncode = subprocess.call(_command(config.name, output_file, circos_path, format))
+            if returncode == 0:
+                measure.written(output_path(output_file, format))
+    finally:
+        config.close()
+
+    if returncode != 0:
+        raise RuntimeError("circos exited with status %i" % returncode)
+
+    if cache is not None:
+        cache.store(key, output_file, format)
+
+
+def _run(configuration, output_file, circos_path=None, format="png", timeout=None, cache=None, key=None):
+    if key is not None:
+        _remove_output(output_file, format)
+
+    config = _write_config(configuration)
+    start = time.time()
+    try:
+        process = subprocess.Popen(_command(config.name, output_file, circos_path, format),
+                                   stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+        try:
+            stdout, stderr = process.communicate(timeout=timeout)
+            timed_out = False
+        except subprocess.TimeoutExpired:
+            process.kill()
+            stdout, stderr = process.communicate()
+            timed_out = True
+    finally:
+        config.close()
+
+    result = RenderResult(output_file, None if timed_out else process.returncode, stdout, stderr, time.time() - start,
+                          timed_out, False)
+    if key is not None and result.ok:
+        cache.store(key, output_file, format)
+    return result
+
+
+def _cached(configuration, output_file, format, cache):
+    # returns the cache key, or a RenderResult when the image was found in the cache
+    if cache is None:
+        return None
+    start = time.time()
+    key = cache.key(configuration)
+    if cache.fetch(key, output_file, format):
+        return RenderResult(output_file, 0, "", "", time.time() - start, False, True)
+    return key
+
+
+def render(circos_object, output_file, circos_path=None, format="png", timeout=None, cache=None):
+    """
+    Runs circos for one object and returns a RenderResult instead of raising on failure.
+    """
+    circos_path = getattr(circos_object, "circos_path", None) or circos_path
+    with workspace(circos_object):
+        configuration = str(circos_object)
+        key = _cached(configuration, output_file, format, cache)
+        if isinstance(key, RenderResult):
+            return key
+        return _run(configuration, output_file, circos_path=circos_path, format=format, timeout=timeout, cache=cache,
+                    key=key)
+
+
+def render_many(jobs, circos_path=None, format="png", max_workers=None, timeout=None, cache=None):
+    """
+    Renders many figures running several circos processes at a time.
+
+    Arguments
+    =========
+    jobs :
+        iterable of (circos_object, output_file) pairs
+    circos_path :
+        circos installation used for objects that do not define their own circos_path
+    format :
+        output format (png or svg)
+    max_workers :
+        maximum number of concurrent circos processes (defaults to the number of CPUs)
+    timeout :
+        seconds after which a circos process is killed
+    cache :
+        optional RenderCache, figures found in it are not rendered again
+
+    Returns
+    =======
+    list
+        one RenderResult per job, in the order of the jobs
+    """
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+
+    # each figure is prepared (data files written, configuration rendered) in its own task, its data files are
+    # only on disk while it renders. Tasks run in the context of the caller (e.g. its active TrackStore)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(contextvars.copy_context().run, render, circos_object, output_file,
+                                   circos_path=circos_path, format=format, timeout=timeout, cache=cache)
+                   for circos_object, output_file in jobs]
+        return [future.result() for future in futures]
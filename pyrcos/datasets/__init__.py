@@ -0,0 +1,39 @@
+import numpy as np
+from pandas import DataFrame
+
+
+def apply_normalization(normalization, values, **kwargs):
+    """
+    Applies a normalization function to an array of values.
+
+    numpy aware functions (e.g. numpy.log) are called once with the whole array, scalar functions (e.g. math.log,
+    or functions branching on their argument) are vectorized.
+    """
+    values = np.asarray(values, dtype=float)
+    try:
+        normalized = np.asarray(normalization(values, **kwargs), dtype=float)
+        if normalized.shape == values.shape:
+            return normalized
+    except (TypeError, ValueError):
+        # math functions refuse arrays, branches on an array raise "truth value of an array is ambiguous"
+        pass
+    return np.vectorize(normalization, otypes=[float])(values, **kwargs)
+
+
+def positions_table(positions):
+    """
+    Gene positions as a DataFrame with locus, start, end and chromosome columns.
+
+    Arguments
+    =========
+    positions :
+        dict of locus -> (start, end, chromosome), DataFrames are returned as they are
+    """
+    if isinstance(positions, DataFrame):
+        return positions
+    loci = list(positions.keys())
+    return DataFrame(dict(locus=loci,
+                          start=[positions[locus][0] for locus in loci],
+                          end=[positions[locus][1] for locus in loci],
+                          chromosome=[positions[locus][2] for locus in loci]),
+                     columns=["locus", "start", "end", "chromosome"])
\ No newline at end of file
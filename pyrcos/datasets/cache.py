@@ -0,0 +1,261 @@
+import hashlib
+import importlib
+import json
+import os
+import shutil
+from collections import OrderedDict
+
+import numpy as np
+from pandas import DataFrame, RangeIndex
+
+from pyrcos.cache import file_hash
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "pyrcos", "datasets")
+_META = "meta.json"
+_SOURCES = "sources.json"
+_INDEX = "__index__"
+
+
+def _code(code):
+    # nested code objects (e.g. a lambda in a function) would be keyed by their address
+    constants = [_code(constant) if hasattr(constant, "co_code") else repr(constant) for constant in code.co_consts]
+    return [code.co_code.hex(), list(code.co_names), constants]
+
+
+def _cell(cell, seen):
+    try:
+        return _parameter(cell.cell_contents, seen)
+    except ValueError:
+        return "<empty>"
+
+
+def _parameter(value, seen=()):
+    # functions (e.g. normalizations) are identified by name, their repr contains an address. All lambdas and the
+    # functions defined in the same place share a name, so the code and the values it closes over are hashed too
+    name = getattr(value, "__qualname__", getattr(value, "__name__", None))
+    if name is None:
+        return repr(value)
+    name = "%s.%s" % (getattr(value, "__module__", None) or type(value).__module__, name)
+    code = getattr(value, "__code__", None)
+    if code is None:
+        if "<lambda>" in name or "<locals>" in name:
+            raise TypeError("Cannot cache calls with %s, it cannot be told apart from other %s" % (name, name))
+        return name
+    if id(value) in seen:
+        return name
+    seen = seen + (id(value),)
+    body = [_code(code), [_cell(cell, seen) for cell in value.__closure__ or ()],
+            [_parameter(default, seen) for default in value.__defaults__ or ()]]
+    return "%s:%s" % (name, hashlib.sha1(json.dumps(body).encode("utf-8")).hexdigest())
+
+
+def _is_source(value):
+    if isinstance(value, dict):
+        return _is_source(list(value.values()))
+    if isinstance(value, (list, tuple)):
+        return len(value) > 0 and all(_is_source(item) for item in value)
+    return isinstance(value, str) and os.path.isfile(value)
+
+
+def _sources(value):
+    # the paths of a source argument and the argument with the paths replaced by their position
+    paths = []
+
+    def _replace(item):
+        if isinstance(item, dict):
+            return {name: _replace(item[name]) for name in sorted(item)}
+        if isinstance(item, (list, tuple)):
+            return [_replace(i) for i in item]
+        paths.append(item)
+        return "<source %i>" % (len(paths) - 1)
+
+    return paths, repr(_replace(value))
+
+
+def _column(values):
+    values = np.asarray(values)
+    if values.dtype == object:
+        values = values.astype(str)
+    return values
+
+
+def _table_columns(table):
+    columns = [(str(name), _column(table[name].values)) for name in table.columns]
+    if not isinstance(table.index, RangeIndex):
+        columns.append((_INDEX, _column(table.index.values)))
+    return columns
+
+
+def _table(columns):
+    index = columns.pop(_INDEX, None)
+    table = DataFrame(columns, copy=False)
+    if index is not None:
+        table.index = index
+    return table
+
+
+class DatasetCache(object):
+    """
+    On-disk cache of parsed datasets, each entry is a directory with one .npy file per column, loaded memory
+    mapped. Entries are keyed by the hash of the content of the source files and the parameters of the parser.
+
+    DataFrames, mappings of names to DataFrames or to arrays and namedtuples of arrays can be cached, object
+    columns are stored as fixed width strings.
+
+    Arguments
+    =========
+    directory :
+        where the entries are kept (defaults to ~/.cache/pyrcos/datasets)
+    max_size :
+        maximum size of the cache in bytes, the least recently used entries are evicted beyond it
+    """
+
+    def __init__(self, directory=None, max_size=1 << 30):
+        self.directory = directory if directory is not None else DEFAULT_CACHE_DIR
+        self.max_size = max_size
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+        self._hashes = self._read_json(os.path.join(self.directory, _SOURCES), {})
+
+    @staticmethod
+    def _read_json(path, default):
+        try:
+            with open(path) as fr:
+                return json.load(fr)
+        except (IOError, ValueError):
+            return default
+
+    def source_hash(self, path):
+        """
+        Hash of the content of a source file, remembered while its size and modification time do not change.
+        """
+        stat = os.stat(path)
+        signature = "%s:%i:%i" % (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+        if signature not in self._hashes:
+            self._hashes[signature] = file_hash(path)
+            temp = os.path.join(self.directory, "%s.%i.tmp" % (_SOURCES, os.getpid()))
+            with open(temp, "w") as fw:
+                json.dump(self._hashes, fw)
+            os.replace(temp, os.path.join(self.directory, _SOURCES))
+        return self._hashes[signature]
+
+    def key(self, function, sources, *args, **kwargs):
+        parameters = dict(function=_parameter(function), sources=[self.source_hash(path) for path in sources],
+                          args=[_parameter(arg) for arg in args],
+                          kwargs={name: _parameter(value) for name, value in kwargs.items()})
+        return hashlib.sha1(json.dumps(parameters, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key)
+
+    def fetch(self, key):
+        """
+        The cached value of key with its arrays memory mapped, None if it is not cached.
+        """
+        path = self.path(key)
+        meta = self._read_json(os.path.join(path, _META), None)
+        if meta is None:
+            return None
+        os.utime(os.path.join(path, _META), None)
+
+        groups = OrderedDict()
+        for i, (group, name) in enumerate(meta["columns"]):
+            groups.setdefault(group, OrderedDict())[name] = np.load(os.path.join(path, "%i.npy" % i), mmap_mode="r")
+
+        kind = meta["kind"]
+        if kind == "table":
+            return _table(groups.get("", OrderedDict()))
+        elif kind == "tables":
+            return OrderedDict((group, _table(groups.get(group, OrderedDict()))) for group in meta["groups"])
+        arrays = groups.get("", OrderedDict())
+        if kind == "tuple":
+            cls = getattr(importlib.import_module(meta["module"]), meta["class"])
+            return cls(**arrays)
+        return arrays
+
+    def store(self, key, value):
+        if isinstance(value, DataFrame):
+            kind, groups = "table", [("", _table_columns(value))]
+        elif isinstance(value, tuple) and hasattr(value, "_fields"):
+            kind, groups = "tuple", [("", [(name, _column(getattr(value, name))) for name in value._fields])]
+        elif isinstance(value, dict) and all(isinstance(table, DataFrame) for table in value.values()):
+            kind, groups = "tables", [(str(name), _table_columns(table)) for name, table in value.items()]
+        elif isinstance(value, dict):
+            kind, groups = "arrays", [("", [(str(name), _column(array)) for name, array in value.items()])]
+        else:
+            raise TypeError("Cannot cache %s, use DataFrames, namedtuples or dicts of arrays" % type(value).__name__)
+
+        meta = dict(kind=kind, groups=[group for group, _ in groups], columns=[])
+        if kind == "tuple":
+            meta.update(module=type(value).__module__, **{"class": type(value).__name__})
+
+        # written next to the entry and renamed so readers never see a partial entry
+        temp = "%s.%i.tmp" % (self.path(key), os.getpid())
+        os.makedirs(temp)
+        for group, columns in groups:
+            for name, column in columns:
+                np.save(os.path.join(temp, "%i.npy" % len(meta["columns"])), column)
+                meta["columns"].append((group, name))
+        with open(os.path.join(temp, _META), "w") as fw:
+            json.dump(meta, fw)
+
+        try:
+            os.rename(temp, self.path(key))
+        except OSError:
+            # stored concurrently by another process
+            shutil.rmtree(temp)
+        self.evict()
+
+    def cached(self, function, *args, **kwargs):
+        """
+        Calls function(*args, **kwargs) or loads its result from the cache. The arguments that are paths (or lists
+        of paths) to existing files are the sources, the other arguments are part of the key.
+        """
+        sources = []
+
+        def _argument(value):
+            if not _is_source(value):
+                return value
+            paths, replaced = _sources(value)
+            sources.extend(paths)
+            return replaced
+
+        parameters = [_argument(arg) for arg in args]
+        named = {name: _argument(value) for name, value in kwargs.items()}
+        key = self.key(function, sources, *parameters, **named)
+        value = self.fetch(key)
+        if value is None:
+            value = function(*args, **kwargs)
+            self.store(key, value)
+            # entries larger than the cache are evicted right away
+            value = self.fetch(key) if os.path.isdir(self.path(key)) else value
+        return value
+
+    def _entries(self):
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if os.path.isdir(path) and not name.endswith(".tmp"):
+                yield path
+
+    def _entry_size(self, path):
+        return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+    def size(self):
+        return sum(self._entry_size(path) for path in self._entries())
+
+    def evict(self):
+        entries = []
+        for path in self._entries():
+            meta = os.path.join(path, _META)
+            entries.append((os.stat(meta).st_mtime if os.path.isfile(meta) else 0, self._entry_size(path), path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_size:
+                break
+            shutil.rmtree(path)
+            total -= size
+
+    def clear(self):
+        for path in self._entries():
+            shutil.rmtree(path)
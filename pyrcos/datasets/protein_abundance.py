@@ -1,26 +1,87 @@
 import tempfile
+from collections import OrderedDict
 from math import log
 
+import numpy as np
+from pandas import DataFrame, concat, read_csv
+
+from pyrcos.datasets import apply_normalization, positions_table
+
+
+def read_paxdb_table(datasets, normalization=np.log, normalization_kwargs={}):
+    """
+    Reads one or many PaxDb datasets into a single table.
+
+    Arguments
+    =========
+    datasets :
+        path of a dataset, list of paths or dict of name -> path
+    normalization :
+        function applied to the abundances, numpy aware functions are applied to the whole column at once
+
+    Returns
+    =======
+    DataFrame
+        dataset, string_id, locus and abundance columns
+    """
+    if isinstance(datasets, str):
+        datasets = [datasets]
+    if not isinstance(datasets, dict):
+        datasets = OrderedDict((path, path) for path in datasets)
+
+    tables = []
+    for name, path in datasets.items():
+        data = read_csv(path, sep="\t", comment="#", header=None, usecols=[1, 2],
+                        names=["internal_id", "string_external_id", "abundance"],
+                        dtype={"string_external_id": str, "abundance": np.float64})
+        ids = data["string_external_id"].str.split(".", n=1, expand=True)
+        abundance = data["abundance"].values
+        if normalization is not None:
+            abundance = apply_normalization(normalization, abundance, **normalization_kwargs)
+        tables.append(DataFrame(dict(dataset=name, string_id=ids[0].values, locus=ids[1].values,
+                                     abundance=abundance),
+                                columns=["dataset", "string_id", "locus", "abundance"]))
+
+    return concat(tables, ignore_index=True)
+
 
 def read_paxdb(dataset, normalization=log, normalization_kwargs={}):
-    res = {}
-    with open(dataset, "r") as data:
-        for line in data:
-            if line.startswith("#"):
-                continue
+    table = read_paxdb_table(dataset, normalization=normalization, normalization_kwargs=normalization_kwargs)
+    return dict(zip(table["locus"], table["abundance"]))
+
 
-            (internal_id, string_external_id, abundance) = line.split("\t")
-            (string_id, locus) = string_external_id.split(".")
-            res[locus] = normalization(float(abundance), **normalization_kwargs)
+def convert_abundance_to_tables(abundance, positions):
+    """
+    Joins abundances with gene positions.
 
-    return res
+    Arguments
+    =========
+    abundance :
+        table returned by read_paxdb_table
+    positions :
+        dict of locus -> (start, end, chromosome) or DataFrame with locus, start, end and chromosome columns
+
+    Returns
+    =======
+    OrderedDict
+        dataset -> DataFrame with chromosome, start, end and value columns
+    """
+    merged = abundance.merge(positions_table(positions), on="locus", how="inner", sort=False)
+    tables = OrderedDict()
+    for dataset, rows in merged.groupby("dataset", sort=False):
+        tables[dataset] = DataFrame(dict(chromosome=rows["chromosome"].values, start=rows["start"].values,
+                                         end=rows["end"].values, value=rows["abundance"].values),
+                                    columns=["chromosome", "start", "end", "value"])
+    return tables
 
 
 def convert_abundance_to_file(abundance, positions):
-    file = tempfile.NamedTemporaryFile()
-    for locus in abundance.keys():
-        (start, end, chromosome) = positions[locus]
-        file.write("%s %i %i %f\n" % (chromosome, start, end, abundance[locus]))
+    if isinstance(abundance, dict):
+        abundance = DataFrame(dict(dataset="", locus=list(abundance.keys()), abundance=list(abundance.values())))
+
+    file = tempfile.NamedTemporaryFile("w+")
+    for table in convert_abundance_to_tables(abundance, positions).values():
+        table.to_csv(file, sep=" ", index=False, header=False, float_format="%f")
 
     file.flush()
     return file
\ No newline at end of file
@@ -1,96 +1,275 @@
+import hashlib
 import logging
+import os
 import tempfile
 
+import numpy as np
+from pandas import DataFrame, Index
+
+from pyrcos.datasets import positions_table
+
 logger = logging.getLogger(__file__)
 
+REGULATION_TYPES = ("+", "-", "+-", "?")
+REGULATION_COLORS = {"+": "green", "-": "red", "+-": "blue"}
+DEFAULT_REGULATION_COLOR = "grey"
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "pyrcos", "regulondb")
 
-class TranscriptionFactor:
-    pass
 
+class TranscriptionFactor(object):
+    __slots__ = ("id", "name", "genes")
 
-class Gene:
-    pass
+    def __init__(self, id=None, name=None, genes=None):
+        self.id = id
+        self.name = name
+        self.genes = genes
 
 
-def _parse_regulondb_genes_file(genes_file):
-    genes = {}
-    name2loci = {}
+class Gene(object):
+    __slots__ = ("name", "locus", "start", "end")
+
+    def __init__(self, name=None, locus=None, start=None, end=None):
+        self.name = name
+        self.locus = locus
+        self.start = start
+        self.end = end
 
-    with open(genes_file, "rU") as genes_data:
-        for line in genes_data:
-            if line.startswith("#"):
-                continue
 
-            row = line.split("\t")
-            gene = Gene()
-            gene.name = row[1]
-            gene.locus = row[2]
-            gene.start = int(row[3])
-            gene.end = int(row[4])
+def _data_lines(path):
+    with open(path, "r") as data:
+        for line in data:
+            if not line.startswith("#"):
+                yield line.rstrip("\r\n").split("\t")
 
-            if len(gene.locus) > 0:
-                if gene.name.upper() in name2loci:
-                    raise RuntimeError("Name already found: %s" % gene.name)
-                else:
-                    name2loci[gene.name.upper()] = gene.locus
-                    genes[gene.locus] = gene
 
-    return genes, name2loci
+def _parse_regulondb_genes_file(genes_file):
+    names, loci, starts, ends = [], [], [], []
+    name2index = {}
+    for row in _data_lines(genes_file):
+        if len(row[2]) == 0:
+            continue
+        if row[1].upper() in name2index:
+            raise RuntimeError("Name already found: %s" % row[1])
+        name2index[row[1].upper()] = len(names)
+        names.append(row[1])
+        loci.append(row[2])
+        starts.append(int(row[3]))
+        ends.append(int(row[4]))
+
+    return (np.array(names, dtype=str), np.array(loci, dtype=str), np.array(starts, dtype=np.int64),
+            np.array(ends, dtype=np.int64), name2index)
 
 
 def _parse_transcription_factors_file(transcription_factors_file):
     transcription_factors = {}
+    for row in _data_lines(transcription_factors_file):
+        transcription_factors[row[1].upper()] = (row[0], row[1], row[2].split(", "))
+    return transcription_factors
+
 
-    with open(transcription_factors_file, "rU") as tf_data:
-        for line in tf_data:
-            if line.startswith("#"):
+def _parse_interactions_file(interactions_file, name2index, transcription_factors):
+    tf_names = []
+    tf_index = {}
+    tfs, tf_genes, targets, regulations = [], [], [], []
+    codes = {regulation: code for code, regulation in enumerate(REGULATION_TYPES)}
+    unknown = codes["?"]
+    missing = 0
+    for row in _data_lines(interactions_file):
+        target = name2index.get(row[1].upper())
+        tf = transcription_factors.get(row[0].upper())
+        if target is None or tf is None:
+            missing += 1
+            continue
+
+        if row[0].upper() not in tf_index:
+            tf_index[row[0].upper()] = len(tf_names)
+            tf_names.append(tf[1])
+        for tf_gene_name in tf[2]:
+            tf_gene = name2index.get(tf_gene_name.upper())
+            if tf_gene is None:
+                missing += 1
                 continue
-            row = line.split("\t")
-            tf = transcription_factors[row[1].upper()] = TranscriptionFactor()
-            tf.id = row[0]
-            tf.genes = row[2].split(", ")
+            tfs.append(tf_index[row[0].upper()])
+            tf_genes.append(tf_gene)
+            targets.append(target)
+            regulations.append(codes.get(row[2].strip(), unknown))
 
-    return transcription_factors
+    if missing > 0:
+        logger.warning("%i interactions refer to unknown genes or transcription factors" % missing)
 
+    return (np.array(tf_names, dtype=str), np.array(tfs, dtype=np.int32), np.array(tf_genes, dtype=np.int32),
+            np.array(targets, dtype=np.int32), np.array(regulations, dtype=np.int8))
 
-def _parse_interactions_file(interactions_file, genes, name2loci, transcription_factors):
-    interactions = []
-    with open(interactions_file, "rU") as inter_file:
-        for line in inter_file:
-            if line.startswith("#"):
-                continue
-            try:
-                row = line.split("\t")
-                tf_name = row[0]
-                regulation_type = row[2]
-                target_name = row[1]
-                target_locus = name2loci[target_name.upper()]
-                target_gene = genes[target_locus]
-                tf = transcription_factors[tf_name.upper()]
-                for tf_gene_name in tf.genes:
-                    try:
-                        tf_locus = name2loci[tf_gene_name.upper()]
-                        tf_gene = genes[tf_locus]
-                        logger.info("TF_GENE: %s" % target_gene)
-                        interactions.append((tf_gene, target_gene, regulation_type))
-                        logger.info("DONE")
-                    except KeyError as e:
-                        logger.error(e)
-            except KeyError as e:
-                logger.error(e)
-
-        return interactions
+
+def _sources_signature(paths):
+    return np.array(["%s:%i:%i" % (os.path.abspath(path), os.stat(path).st_size, os.stat(path).st_mtime_ns)
+                     for path in paths], dtype=str)
+
+
+class RegulatoryNetwork(object):
+    """
+    Regulatory network kept as integer indexed arrays.
+
+    Arguments
+    =========
+    names, loci, starts, ends :
+        one entry per gene
+    tf_names :
+        one entry per transcription factor
+    tfs :
+        transcription factor (index into tf_names) of each interaction
+    tf_genes :
+        gene (index into the gene arrays) coding the transcription factor of each interaction
+    targets :
+        regulated gene (index into the gene arrays) of each interaction
+    regulations :
+        regulation type of each interaction, as an index into REGULATION_TYPES
+    """
+    _arrays = ("names", "loci", "starts", "ends", "tf_names", "tfs", "tf_genes", "targets", "regulations")
+
+    def __init__(self, names, loci, starts, ends, tf_names, tfs, tf_genes, targets, regulations):
+        self.names = names
+        self.loci = loci
+        self.starts = starts
+        self.ends = ends
+        self.tf_names = tf_names
+        self.tfs = tfs
+        self.tf_genes = tf_genes
+        self.targets = targets
+        self.regulations = regulations
+
+    def __len__(self):
+        return len(self.targets)
+
+    @classmethod
+    def parse(cls, genes_file, transcription_factors_file, interactions_file):
+        names, loci, starts, ends, name2index = _parse_regulondb_genes_file(genes_file)
+        transcription_factors = _parse_transcription_factors_file(transcription_factors_file)
+        interactions = _parse_interactions_file(interactions_file, name2index, transcription_factors)
+        return cls(names, loci, starts, ends, *interactions)
+
+    @classmethod
+    def load(cls, genes_file, transcription_factors_file, interactions_file, cache_file=None):
+        """
+        Same as parse but keeps the parsed network in a binary cache file, reused until one of the source files
+        changes (size or modification time).
+        """
+        sources = [genes_file, transcription_factors_file, interactions_file]
+        signature = _sources_signature(sources)
+        if cache_file is None:
+            key = hashlib.sha1("\n".join(os.path.abspath(path) for path in sources).encode("utf-8")).hexdigest()
+            cache_file = os.path.join(DEFAULT_CACHE_DIR, "%s.npz" % key)
+
+        if os.path.isfile(cache_file):
+            with np.load(cache_file) as cached:
+                if np.array_equal(cached["signature"], signature):
+                    return cls(*[cached[name] for name in cls._arrays])
+
+        network = cls.parse(*sources)
+        network.save(cache_file, signature=signature)
+        return network
+
+    def save(self, path, signature=None):
+        directory = os.path.dirname(path)
+        if len(directory) > 0 and not os.path.isdir(directory):
+            os.makedirs(directory)
+        arrays = {name: getattr(self, name) for name in self._arrays}
+        arrays["signature"] = signature if signature is not None else np.array([], dtype=str)
+        # write next to the destination and rename so readers never see a partial file
+        temp = "%s.%i.tmp" % (path, os.getpid())
+        with open(temp, "wb") as fw:
+            np.savez(fw, **arrays)
+        os.replace(temp, path)
+
+    def gene(self, index):
+        return Gene(str(self.names[index]), str(self.loci[index]), int(self.starts[index]), int(self.ends[index]))
+
+    @property
+    def interactions(self):
+        """
+        The interactions as a sequence of (tf gene, target gene, regulation type) tuples, as returned by
+        parse_regulondb.
+        """
+        return Interactions(self)
+
+    def links(self, positions, colors=REGULATION_COLORS):
+        """
+        Circos links from the transcription factor genes to their targets.
+
+        Arguments
+        =========
+        positions :
+            dict of locus -> (start, end, chromosome) or DataFrame with locus, start, end and chromosome columns
+        colors :
+            dict of regulation type -> color, other types are drawn in grey
+
+        Returns
+        =======
+        DataFrame
+            one link per interaction where both genes have a position
+        """
+        positions = positions_table(positions)
+        gene_rows = Index(positions["locus"]).get_indexer(self.loci)
+        tf_rows = gene_rows[self.tf_genes]
+        target_rows = gene_rows[self.targets]
+        found = (tf_rows >= 0) & (target_rows >= 0)
+        tf_rows, target_rows = tf_rows[found], target_rows[found]
+
+        palette = np.array([colors.get(regulation, DEFAULT_REGULATION_COLOR) for regulation in REGULATION_TYPES])
+        chromosomes = positions["chromosome"].values
+        starts = positions["start"].values
+        ends = positions["end"].values
+        return DataFrame(dict(chromosome1=chromosomes[tf_rows], start1=starts[tf_rows], end1=ends[tf_rows],
+                              chromosome2=chromosomes[target_rows], start2=starts[target_rows],
+                              end2=ends[target_rows],
+                              options=np.char.add("color=", palette[self.regulations[found]])),
+                         columns=["chromosome1", "start1", "end1", "chromosome2", "start2", "end2", "options"])
+
+
+class Interactions(object):
+    """
+    Sequence view over the interactions of a RegulatoryNetwork, the Gene objects are only built for the
+    interactions that are accessed and each gene is built once per iteration.
+    """
+
+    def __init__(self, network):
+        self.network = network
+
+    def __len__(self):
+        return len(self.network)
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return [self[i] for i in range(*item.indices(len(self)))]
+        network = self.network
+        return (network.gene(network.tf_genes[item]), network.gene(network.targets[item]),
+                REGULATION_TYPES[network.regulations[item]])
+
+    def __iter__(self):
+        network = self.network
+        genes = {}
+        for tf_gene, target, regulation in zip(network.tf_genes.tolist(), network.targets.tolist(),
+                                               network.regulations.tolist()):
+            if tf_gene not in genes:
+                genes[tf_gene] = network.gene(tf_gene)
+            if target not in genes:
+                genes[target] = network.gene(target)
+            yield genes[tf_gene], genes[target], REGULATION_TYPES[regulation]
 
 
 def parse_regulondb(genes_file, transcription_factors_file, interactions_file):
-    genes, name2loci = _parse_regulondb_genes_file(genes_file)
-    transcription_factors = _parse_transcription_factors_file(transcription_factors_file)
-    interactions = _parse_interactions_file(interactions_file, genes, name2loci, transcription_factors)
-    return interactions
+    return RegulatoryNetwork.parse(genes_file, transcription_factors_file, interactions_file).interactions
 
 
 def convert_interactions_to_links(interactions, posistions):
     temp = tempfile.NamedTemporaryFile("w+")
+    if isinstance(interactions, Interactions):
+        interactions = interactions.network
+    if isinstance(interactions, RegulatoryNetwork):
+        interactions.links(posistions).to_csv(temp, sep=" ", index=False, header=False)
+        temp.flush()
+        return temp
+
     for interaction in interactions:
         tf = interaction[0]
         gene = interaction[1]
@@ -1,20 +1,55 @@
-from pandas import DataFrame
+from collections import OrderedDict
+
+import numpy as np
+from pandas import DataFrame, concat, read_csv
+
+from pyrcos.datasets import apply_normalization
+
+
+def read_essentials(essentials_file, samples, normalization=None, cutoff=100, chunksize=1000000):
+    """
+    Reads the insertions of many samples from an ESSENTIALS export in one pass.
+
+    Only the Position column and the sample columns are read, in chunks of chunksize rows. Rows where the sum of the
+    samples is at or above cutoff are dropped and the remaining rows are summed per position.
+
+    Returns
+    =======
+    DataFrame
+        indexed by position, one column per sample
+    """
+    # a tuple would be taken as a single column name, the counts keep the dtype pandas infers (integers unless
+    # some are missing)
+    samples = list(samples)
+    reader = read_csv(essentials_file, sep="\t", usecols=["Position"] + samples, dtype={"Position": np.int64},
+                      chunksize=chunksize)
+
+    partial = []
+    for chunk in reader:
+        chunk = chunk[chunk[samples].sum(axis=1) < cutoff]
+        partial.append(chunk.groupby("Position")[samples].sum())
+
+    if len(partial) == 0:
+        return DataFrame(columns=samples, index=np.array([], dtype=np.int64))
+
+    # a position may be split across chunks
+    data = concat(partial).groupby(level=0).sum()
+    if normalization is not None:
+        data = DataFrame(apply_normalization(normalization, data.values), index=data.index, columns=data.columns)
+    return data
+
+
+def load_essentials(essentials_file, samples, normalization=None, cutoff=100, chunksize=1000000):
+    """
+    Returns an OrderedDict of sample -> sample data, as accepted by convert_sample_to_table.
+    """
+    data = read_essentials(essentials_file, samples, normalization=normalization, cutoff=cutoff,
+                           chunksize=chunksize)
+    return OrderedDict((sample, DataFrame({"insertions": data[sample]}).dropna()) for sample in samples)
 
 
 def parse_essentials(essentials_file, samples, normalization=None, cutoff=100):
-    data = DataFrame.from_csv(essentials_file, sep="\t", index_col=False)
-    data = data[["Position"] + samples]
-    data["sum"] = data[samples].apply(sum, axis=1)
-    data = data[data["sum"] < cutoff]
-    data = data.groupby("Position").sum()
-    for sample in samples:
-        sample_data = DataFrame(None, index=data.index)
-        if normalization is not None:
-            sample_data["insertions"] = data[sample].apply(normalization)
-        else:
-            sample_data["insertions"] = data[sample]
-
-        sample_data.dropna(inplace=True)
+    for sample_data in load_essentials(essentials_file, samples, normalization=normalization, cutoff=cutoff).values():
         yield sample_data
 
 
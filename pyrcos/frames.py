@@ -0,0 +1,125 @@
+import shutil
+import subprocess
+
+from pyrcos.cmd import output_path, render_many
+from pyrcos.objects import Highlights, Links, Plots
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+
+def animate(frames, output, delay=0.2, loop=0):
+    """
+    Assembles PNG frames into an animation (e.g. a GIF), with Pillow when it is installed and ImageMagick otherwise.
+
+    Arguments
+    =========
+    frames :
+        list of image files, in order
+    output :
+        the animation file, its extension sets the format
+    delay :
+        seconds each frame is shown
+    loop :
+        number of times the animation is played, 0 loops forever
+    """
+    if len(frames) == 0:
+        raise ValueError("No frames to animate")
+
+    if Image is not None:
+        images = [Image.open(frame) for frame in frames]
+        try:
+            images[0].save(output, save_all=True, append_images=images[1:], duration=int(delay * 1000), loop=loop)
+        finally:
+            for image in images:
+                image.close()
+        return output
+
+    executable = shutil.which("magick") or shutil.which("convert")
+    if executable is None:
+        raise RuntimeError("Animations need Pillow or ImageMagick")
+    process = subprocess.run([executable, "-delay", str(int(round(delay * 100))), "-loop", str(loop)] + list(frames) +
+                             [output], stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+    if process.returncode != 0:
+        raise RuntimeError("%s exited with status %i: %s" % (executable, process.returncode, process.stderr))
+    return output
+
+
+class FrameSeries(object):
+    """
+    Frames of an animation, each one the base figure with the data of some of its plots, links or highlights
+    replaced.
+
+    Only the replaced objects are copied for each frame. The karyotype, the ideogram, the ticks and the other plots
+    are shared by all frames, so their data files are written once for the whole series and their configuration
+    is rendered once.
+
+        series = FrameSeries(circos, [{insertions: sample} for sample in samples])
+        series.render("frames/sample%03i")
+        series.animate("samples.gif")
+
+    Arguments
+    =========
+    circos :
+        the base Circos figure
+    frames :
+        one dict per frame mapping plots, links or highlights of the base figure to the data they draw in the frame
+        (a path, DataFrame or array)
+    """
+
+    def __init__(self, circos, frames):
+        self.circos = circos
+        self.frames = list(frames)
+        self.outputs = []
+        self.results = []
+
+    def __len__(self):
+        return len(self.frames)
+
+    def figure(self, index):
+        """
+        The Circos figure of a frame.
+        """
+        substitutions = self.frames[index]
+
+        def _substitute(objects):
+            return [o.with_file(substitutions[o]) if o in substitutions else o for o in objects]
+
+        figure = self.circos._copy()
+        figure.plots = Plots(_substitute(self.circos.plots))
+        figure.links = Links(_substitute(self.circos.links))
+        figure.highlights = Highlights(_substitute(self.circos.highlights))
+        return figure
+
+    def render(self, output_file, format="png", circos_path=None, max_workers=None, timeout=None, cache=None):
+        """
+        Renders all frames in parallel, see pyrcos.cmd.render_many.
+
+        Arguments
+        =========
+        output_file :
+            pattern of the frame files with a placeholder for the frame number, e.g. frames/frame%03i
+
+        Returns
+        =======
+        list
+            one RenderResult per frame, in order
+        """
+        jobs = [(self.figure(i), output_file % i) for i in range(len(self))]
+        self.results = render_many(jobs, circos_path=circos_path, format=format, max_workers=max_workers,
+                                   timeout=timeout, cache=cache)
+        self.outputs = [output_path(frame_file, format) for _, frame_file in jobs]
+        return self.results
+
+    def animate(self, output, delay=0.2, loop=0):
+        """
+        Assembles the rendered PNG frames into an animation, see animate.
+        """
+        if len(self.results) == 0:
+            raise RuntimeError("The frames have not been rendered")
+        failed = [i for i, result in enumerate(self.results) if not result.ok]
+        if len(failed) > 0:
+            raise RuntimeError("Frames %s failed to render" % ", ".join(str(i) for i in failed))
+        return animate(self.outputs, output, delay=delay, loop=loop)
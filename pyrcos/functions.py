@@ -19,7 +19,7 @@ def log(s):
 
 
 def on(s):
-    return "on(s)" % s
+    return "on(%s)" % s
 
 
 def var(s):
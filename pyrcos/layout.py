@@ -0,0 +1,43 @@
+import heapq
+
+import numpy as np
+
+
+def pack_layers(data, margin=0):
+    """
+    Assigns every tile to the lowest layer where it does not overlap the tiles already placed, sweeping the
+    tiles of each chromosome by start as circos does.
+
+    Arguments
+    =========
+    data :
+        DataFrame with chromosome, start and end as its first columns
+    margin :
+        minimum distance in bases between two tiles of the same layer
+
+    Returns
+    =======
+    numpy.ndarray
+        the layer of every row of data
+    """
+    chromosomes = np.asarray(data.iloc[:, 0]).astype(str)
+    starts = np.asarray(data.iloc[:, 1], dtype=np.int64)
+    ends = np.asarray(data.iloc[:, 2], dtype=np.int64)
+    order = np.lexsort((ends, starts, chromosomes))
+    layers = np.zeros(len(order), dtype=np.int64)
+
+    chromosome = None
+    for row, start, end in zip(order.tolist(), starts[order].tolist(), ends[order].tolist()):
+        if chromosomes[row] != chromosome:
+            chromosome = chromosomes[row]
+            placed, free, used = [], [], 0
+        # layers whose last tile ends before this one are free again
+        while placed and placed[0][0] + margin < start:
+            heapq.heappush(free, heapq.heappop(placed)[1])
+        if free:
+            layer = heapq.heappop(free)
+        else:
+            layer, used = used, used + 1
+        heapq.heappush(placed, (end, layer))
+        layers[row] = layer
+    return layers
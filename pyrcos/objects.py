@@ -1,11 +1,26 @@
+import atexit
+import base64
+import contextlib
+import copy
 import re
+import shutil
 import tempfile
+import weakref
 import jinja2
 import os
 
-from pyrcos.cmd import circos
-from IPython.core.display import display, Image, SVG
+from pyrcos.aio import circos_async, circos_lines
+from pyrcos.cache import configuration_key
+from pyrcos.cmd import circos, output_path
+from pyrcos.layout import pack_layers
+from pyrcos.binning import bin_envelope, bin_size, bin_track, bundle_links, karyotype_length
+from pyrcos.profiling import phase
+from pyrcos.region import slice_karyotype, slice_links, slice_track
+from pyrcos.rules import RuleError, _merge_options, apply_rules
+from pyrcos.tracks import TrackFile, TrackStore, read_track, track_fields
+from IPython.display import display, FileLink, SVG
 from pandas import DataFrame
+import numpy as np
 
 _dir = os.path.dirname(__file__)
 
@@ -14,20 +29,113 @@ template_env = jinja2.Environment(loader=template_loader)
 
 DEFAULT_INCLUDE = ["etc/housekeeping.conf", "etc/colors_fonts_patterns.conf"]
 
+BINNABLE_TYPES = ("histogram", "line", "scatter", "heatmap")
+
+
+def _label(circos_object):
+    file = getattr(circos_object, "file", None)
+    if file is None:
+        return type(circos_object).__name__
+    return "%s %s" % (type(circos_object).__name__, file.name)
+
+
+def _copy_container(value):
+    if isinstance(value, dict):
+        return {name: _copy_container(item) for name, item in value.items()}
+    if isinstance(value, list):
+        return [_copy_container(item) for item in value]
+    if isinstance(value, (Axes, Ticks)):
+        return value._copy()
+    if isinstance(value, (Plots, Rules, Backgrounds, Links, Highlights)):
+        clone = copy.copy(value)
+        clone.__dict__ = {name: _copy_container(item) for name, item in value.__dict__.items()}
+        return clone
+    return value
+
 
 class CircosObject(object):
+    """
+    Base class of the objects rendered from a template.
+
+    The rendered configuration is kept until an attribute of the object changes, changes are propagated to the
+    objects that include this one (e.g. a Rule invalidates its Plot and the Plot its Circos). Changes that do not
+    go through attribute assignment (e.g. appending to plot.rules.rules) must be followed by a call to invalidate.
+    """
     __template__ = None
 
     def __str__(self):
         return self.configuration
 
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, value)
+        if not name.startswith("_"):
+            self._adopt(value)
+            self.invalidate()
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state.pop("_parents", None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        for name, value in state.items():
+            if not name.startswith("_"):
+                self._adopt(value)
+
+    def _adopt(self, value):
+        if isinstance(value, CircosObject):
+            children = [value]
+        elif isinstance(value, (list, tuple, Plots, Rules, Backgrounds, Links, Highlights)):
+            children = [child for child in value if isinstance(child, CircosObject)]
+        else:
+            return
+
+        for child in children:
+            if "_parents" not in child.__dict__:
+                child.__dict__["_parents"] = weakref.WeakSet()
+            child.__dict__["_parents"].add(self)
+
+    def _copy(self):
+        # copy without the caches, containers (attributes, rules, axes...) are copied so changing the copy leaves
+        # this object untouched, the objects in them are shared and know the copy as a parent
+        clone = copy.copy(self)
+        for name in [name for name in clone.__dict__ if name.startswith("_")]:
+            del clone.__dict__[name]
+        for name, value in clone.__dict__.items():
+            clone.__dict__[name] = _copy_container(value)
+            clone._adopt(clone.__dict__[name])
+        return clone
+
+    def invalidate(self):
+        # containers such as Ticks or Axes may never have been rendered on their own, so parents are always told
+        self.__dict__.pop("_configuration", None)
+        for parent in list(self.__dict__.get("_parents", ())):
+            parent.invalidate()
+
+    @classmethod
+    def _template(cls):
+        template = cls.__dict__.get("_compiled_template")
+        if template is None:
+            template = template_env.get_template(cls.__template__)
+            cls._compiled_template = template
+        return template
+
     @property
     def configuration(self):
-        template = template_env.get_template(self.__template__)
-        vars = dict(self.__dict__)
+        configuration = self.__dict__.get("_configuration")
+        if configuration is None:
+            with phase("render", _label, self):
+                configuration = self._render()
+            self.__dict__["_configuration"] = configuration
+        return configuration
+
+    def _render(self, **overrides):
+        vars = {k: v for k, v in self.__dict__.items() if not k.startswith("_")}
         if "attributes" in vars:
-            vars["attributes"] = {k: v for k, v in vars["attributes"].iteritems() if v is not None}
-        return template.render(vars)
+            vars["attributes"] = {k: v for k, v in vars["attributes"].items() if v is not None}
+        vars.update(overrides)
+        return self._template().render(vars)
 
 
 class CircosObjectWithinRadius(CircosObject):
@@ -36,20 +144,29 @@ class CircosObjectWithinRadius(CircosObject):
         self.r1 = r1
 
 
+def _track_file(file):
+    if isinstance(file, str):
+        return TrackFile(file)
+    elif isinstance(file, (DataFrame, np.ndarray)):
+        return TrackStore.current().add(file)
+    return file
+
+
 class CircosObjectWithFile(CircosObject):
     def __init__(self, file):
-        if isinstance(file, str):
-            file = open(file)
-        elif isinstance(file, DataFrame):
-            temp = tempfile.NamedTemporaryFile()
-            file.to_csv(temp, sep="\t", index=False, header=False)
-            temp.flush()
-            file = temp
+        self.file = _track_file(file)
 
-        self.file = file
+    def with_file(self, file):
+        """
+        Copy of the object drawing another file (a path, DataFrame or array), the other attributes are shared.
+        """
+        clone = self._copy()
+        clone.file = _track_file(file)
+        return clone
 
 
 class KaryotypeChromosome(object):
+    __slots__ = ("id", "label", "start", "stop", "color")
     _regex_ = re.compile("chr\s\-\s(.+)\s(.+)\s(.+)\s(.+)\s(.+)$")
 
     def __init__(self, id, label, start, stop, color):
@@ -69,6 +186,7 @@ class KaryotypeChromosome(object):
 
 
 class KaryotypeBand(object):
+    __slots__ = ("chromosome_id", "id", "label", "start", "stop", "color")
     _regex_ = re.compile("band\s(.+)\s(.+)\s(.+)\s(.+)\s(.+)\s(.+)$")
 
     def __init__(self, chromosome_id, id, label, start, stop, color):
@@ -88,40 +206,134 @@ class KaryotypeBand(object):
         return KaryotypeBand(group[0], group[1], group[2], int(group[3]), int(group[4]), group[5])
 
 
-class Karyotype(object):
-    def __init__(self, rows):
-        self.rows = rows
+class Karyotype(CircosObject):
+    """
+    Column oriented karyotype, chromosomes and bands are kept as numpy arrays. Indexing or iterating builds
+    KaryotypeChromosome and KaryotypeBand rows on demand.
+
+    Arguments
+    =========
+    rows :
+        list of KaryotypeChromosome and KaryotypeBand
+
+    The karyotype file is kept in the current TrackStore and reused until one of the columns is assigned, in place
+    changes to the arrays must be followed by a call to invalidate.
+    """
+    _columns = ("kinds", "parents", "ids", "labels", "starts", "stops", "colors")
+
+    def __init__(self, rows=None):
+        rows = [] if rows is None else rows
+        kinds = ["chr" if isinstance(r, KaryotypeChromosome) else "band" for r in rows]
+        parents = ["-" if isinstance(r, KaryotypeChromosome) else r.chromosome_id for r in rows]
+        self._set_columns(kinds, parents, [r.id for r in rows], [r.label for r in rows], [r.start for r in rows],
+                          [r.stop for r in rows], [r.color for r in rows])
+
+    def _set_columns(self, kinds, parents, ids, labels, starts, stops, colors):
+        self.kinds = np.asarray(kinds, dtype=str)
+        self.parents = np.asarray(parents, dtype=str)
+        self.ids = np.asarray(ids, dtype=str)
+        self.labels = np.asarray(labels, dtype=str)
+        self.starts = np.asarray(starts, dtype=np.int64)
+        self.stops = np.asarray(stops, dtype=np.int64)
+        self.colors = np.asarray(colors, dtype=str)
+
+    @classmethod
+    def from_arrays(cls, ids, labels, starts, stops, colors, kinds=None, parents=None):
+        """
+        Builds a karyotype from columns, without kinds and parents all rows are chromosomes.
+        """
+        karyotype = cls.__new__(cls)
+        if kinds is None:
+            kinds = np.full(len(ids), "chr")
+        if parents is None:
+            parents = np.full(len(ids), "-")
+        karyotype._set_columns(kinds, parents, ids, labels, starts, stops, colors)
+        return karyotype
+
+    def __len__(self):
+        return len(self.ids)
 
     def __str__(self):
-        return "\n".join([str(r) for r in self.rows])
+        if len(self) == 0:
+            return ""
+        lines = self.kinds
+        for column in (self.parents, self.ids, self.labels, self.starts.astype(str), self.stops.astype(str),
+                       self.colors):
+            lines = np.char.add(np.char.add(lines, " "), column)
+        return "\n".join(lines.tolist())
+
+    @property
+    def chromosomes(self):
+        return self.kinds == "chr"
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return [self[i] for i in range(*item.indices(len(self)))]
+        if self.kinds[item] == "chr":
+            return KaryotypeChromosome(str(self.ids[item]), str(self.labels[item]), int(self.starts[item]),
+                                       int(self.stops[item]), str(self.colors[item]))
+        return KaryotypeBand(str(self.parents[item]), str(self.ids[item]), str(self.labels[item]),
+                             int(self.starts[item]), int(self.stops[item]), str(self.colors[item]))
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    @property
+    def rows(self):
+        return list(self)
+
+    def invalidate(self):
+        self.__dict__.pop("_file", None)
+        for parent in list(self.__dict__.get("_parents", ())):
+            parent.invalidate()
 
     @property
     def file(self):
-        file = tempfile.NamedTemporaryFile("w+")
-        file.write(str(self))
-        file.flush()
+        file = self.__dict__.get("_file")
+        if file is None:
+            file = TrackStore.current().add(str(self), kind="karyotype")
+            self.__dict__["_file"] = file
         return file
 
     @property
     def filename(self):
-        self._f = self.file
-        return self._f.name
-
-    def from_file(self, path):
-        rows = []
+        return self.file.name
+
+    @classmethod
+    def parse(cls, text):
+        rows = [line.split() for line in text.splitlines()
+                if len(line.strip()) > 0 and not line.lstrip().startswith("#")]
+        for row in rows:
+            if len(row) < 7:
+                raise ValueError("Malformed karyotype line, expected 7 fields: %s" % " ".join(row))
+
+        if len(rows) == 0:
+            table = np.empty((0, 7), dtype=str)
+        else:
+            # extra fields are ignored
+            table = np.array([row[0:7] for row in rows], dtype=str)
+
+        return cls.from_arrays(table[:, 2], table[:, 3], table[:, 4].astype(np.int64), table[:, 5].astype(np.int64),
+                               table[:, 6], kinds=table[:, 0], parents=table[:, 1])
+
+    @classmethod
+    def from_file(cls, path):
         with open(path, 'r') as fr:
-            for line in fr:
-                if line.startswith("chr"):
-                    rows.append(KaryotypeChromosome.parse(line))
-                else:
-                    rows.append(KaryotypeBand.parse(line))
+            return cls.parse(fr.read())
 
 
 class Circos(CircosObject):
+    """
+    In notebooks a Circos object is displayed as a PREVIEW_WIDTH pixels wide PNG preview, display_svg shows the full
+    resolution SVG. Both renders are reused until the figure changes.
+    """
     __template__ = "circos.conf.template"
+    PREVIEW_WIDTH = 300
+    SVG_INLINE_LIMIT = 5 * 1024 * 1024
 
     def __init__(self, karyotypes, ideogram=None, plots=None, ticks=None, links=None, highlights=None, include=None,
-                 circos_path=None, width=750, include_defaults=True, **kwargs):
+                 circos_path=None, width=750, include_defaults=True, binning=None, compile_rules=False, **kwargs):
         if isinstance(karyotypes, Karyotype):
             karyotypes = [karyotypes]
 
@@ -144,17 +356,172 @@ class Circos(CircosObject):
         self.highlights = Highlights(highlights)
         self.circos_path = circos_path
         self.attributes = kwargs
+        if binning is not None:
+            self.downsample(how=binning)
+        if compile_rules:
+            self.compile_rules()
+
+    def downsample(self, how="mean", pixels_per_bin=1):
+        """
+        Bins the histogram, line, scatter and heatmap plots that have more points than pixels along the
+        circumference of the plot.
+        """
+        radius = self.radius * self.ideogram.radius
+        for plot in self.plots:
+            if plot.type in BINNABLE_TYPES:
+                size = bin_size(self.karyotypes, plot._outer_radius(radius), pixels_per_bin=pixels_per_bin)
+                plot.downsample(self.karyotypes, radius, how=how, size=size,
+                                min_points=karyotype_length(self.karyotypes) // size)
+
+    def compile_rules(self):
+        """
+        Evaluates the rules of every plot in Python and writes their results in the data files, see
+        Plot.compile_rules.
+
+        Returns
+        =======
+        int
+            the number of rules removed from the configuration
+        """
+        return sum(plot.compile_rules() for plot in self.plots)
+
+    def region(self, chromosome, start, end):
+        """
+        Zoomed copy of the figure showing only [start, end] of chromosome, see regions.
+        """
+        return self.regions([(chromosome, start, end)])
+
+    def regions(self, regions):
+        """
+        Zoomed copy of the figure showing only the given regions.
+
+        The karyotype is reduced to the chromosomes of the regions (spanning all the regions of a chromosome) and
+        every plot, link and highlight gets a data file with only the rows overlapping the regions (links need both
+        ends inside). Rows are selected by binary search on interval indexes kept on the data files.
+
+        Arguments
+        =========
+        regions :
+            list of (chromosome, start, end)
+        """
+        zoomed = self._copy()
+        zoomed.karyotypes = [slice_karyotype(karyotype, regions) for karyotype in self.karyotypes]
+        zoomed.plots = Plots([plot.with_file(slice_track(plot.file, regions)) for plot in self.plots])
+        zoomed.links = Links([link.with_file(slice_links(link.file, regions)) for link in self.links])
+        zoomed.highlights = Highlights([highlight.with_file(slice_track(highlight.file, regions))
+                                        for highlight in self.highlights])
+        return zoomed
+
+    def data_files(self):
+        """
+        The karyotype and data files referenced by the figure.
+        """
+        files = [karyotype.file for karyotype in self.karyotypes]
+        for objects in (self.plots, self.links, self.highlights):
+            files.extend(circos_object.file for circos_object in objects)
+        unique = {}
+        for file in files:
+            unique.setdefault(id(file), file)
+        return list(unique.values())
+
+    @contextlib.contextmanager
+    def workspace(self):
+        """
+        Context manager writing the data files of the figure on enter and removing them on exit.
+        """
+        materialized = []
+        try:
+            for file in self.data_files():
+                if hasattr(file, "materialize"):
+                    file.materialize()
+                    materialized.append(file)
+            yield self
+        finally:
+            for file in materialized:
+                file.release()
+
+    def _display_render(self, format):
+        # the data files are only written when the render cannot be reused: the configuration is unchanged and
+        # every file is content addressed, files given as paths may have changed on disk and have to be hashed
+        state = self.__dict__.get("_display", {})
+        rendered = state.get(format)
+        if (rendered is not None and state.get("configuration") is self.configuration and os.path.exists(rendered)
+                and all(getattr(file, "data", None) is not None for file in self.data_files())):
+            return rendered
+        with self.workspace():
+            return self._workspace_display_render(format)
+
+    def _workspace_display_render(self, format):
+        # renders are reused while the configuration, and the content of the files it references, is unchanged
+        configuration = self.configuration
+        state = self.__dict__.setdefault("_display", {})
+        if state.get("configuration") is not configuration:
+            key = configuration_key(configuration)
+            if state.get("key") != key:
+                for path in (state.get("png"), state.get("svg")):
+                    if path is not None and os.path.exists(path):
+                        os.remove(path)
+                for name in ("png", "svg"):
+                    state.pop(name, None)
+                state["key"] = key
+            state["configuration"] = configuration
+
+        if state.get(format) is None:
+            if "directory" not in state:
+                state["directory"] = tempfile.mkdtemp(prefix="pyrcos-display-")
+                atexit.register(shutil.rmtree, state["directory"], True)
+            if format == "png":
+                # low resolution preview, only the image radius changes
+                configuration = self._render(radius=self.PREVIEW_WIDTH / 2)
+            output = os.path.join(state["directory"], "%s.%s" % (state["key"], format))
+            with phase("display", output):
+                circos(configuration, output_file=output, format=format, circos_path=self.circos_path)
+            state[format] = output_path(output, format)
+        return state[format]
 
-    @property
     def _repr_html_(self):
-        self.temp = self.temp if self.temp is not None else tempfile.NamedTemporaryFile()
-        self.save(self.temp.name)
-        display(SVG(filename=self.temp.name + ".svg"))
-
-        return ""
-
-    def save(self, file_path, format="svg"):
-        circos(self, output_file=file_path, format=format, circos_path=self.circos_path)
+        with open(self._display_render("png"), "rb") as fr:
+            preview = base64.b64encode(fr.read()).decode("ascii")
+        return '<img src="data:image/png;base64,%s" width="%i"/>' % (preview, self.PREVIEW_WIDTH)
+
+    def display_svg(self, inline_limit=None, file_path=None):
+        """
+        Displays the full resolution SVG in a notebook. SVGs larger than inline_limit bytes (SVG_INLINE_LIMIT by
+        default) are not inlined, they are copied to file_path and a link to it is shown instead.
+
+        Arguments
+        =========
+        file_path :
+            where large SVGs are copied, relative to the notebook so Jupyter can serve it (defaults to
+            pyrcos-<hash>.svg in the working directory, the directory of the notebook)
+        """
+        inline_limit = self.SVG_INLINE_LIMIT if inline_limit is None else inline_limit
+        path = self._display_render("svg")
+        size = os.path.getsize(path)
+        if size > inline_limit:
+            if file_path is None:
+                file_path = "pyrcos-%s.svg" % self.__dict__["_display"]["key"][0:12]
+            shutil.copyfile(path, file_path)
+            display(FileLink(file_path, result_html_suffix=" (%i bytes, not inlined)" % size))
+        else:
+            display(SVG(filename=path))
+
+    def save(self, file_path, format="svg", cache=None):
+        with phase("save", file_path):
+            circos(self, output_file=file_path, format=format, circos_path=self.circos_path, cache=cache)
+
+    def save_async(self, file_path, format="svg", cache=None, progress=None):
+        """
+        Coroutine rendering the figure without blocking the event loop, see pyrcos.aio.circos_async.
+        """
+        return circos_async(self, output_file=file_path, format=format, circos_path=self.circos_path, cache=cache,
+                            progress=progress)
+
+    def save_progress(self, file_path, format="svg"):
+        """
+        Async iterator over the lines printed by circos while rendering, see pyrcos.aio.circos_lines.
+        """
+        return circos_lines(self, file_path, circos_path=self.circos_path, format=format)
 
 
 class Ideogram(CircosObject):
@@ -215,6 +582,28 @@ class Link(CircosObjectWithFile):
         self.ribbon = ribbon
         self.thickness = thickness
 
+    def bundle(self, max_gap, min_links=1):
+        """
+        Replaces the links by ribbons merging the links whose ends are within max_gap bases of each other.
+
+        Arguments
+        =========
+        max_gap :
+            largest distance in bases between the ends of two links of a bundle
+        min_links :
+            drop the bundles with fewer links than this
+
+        Returns
+        =======
+        int
+            the number of links collapsed into bundles (or dropped)
+        """
+        data = read_track(self.file)
+        bundles = bundle_links(data, max_gap, min_links=min_links)
+        self.file = TrackStore.current().add(bundles)
+        self.ribbon = True
+        return len(data) - len(bundles)
+
 
 class Rules(object):
     def __init__(self, rules=None):
@@ -225,11 +614,15 @@ class Rules(object):
     def __len__(self):
         return len(self.rules)
 
+    def __getitem__(self, item):
+        return self.rules[item]
+
 
 class Rule(CircosObject):
     __template__ = "rule.config.template"
 
-    def __init__(self, condition=None, color=None, show=True, flow=None, radius1=None, radius2=None):
+    def __init__(self, condition=None, color=None, show=True, flow=None, radius1=None, radius2=None,
+                 overwrite=False):
         super(Rule, self).__init__()
         self.condition = condition
         self.color = color
@@ -237,6 +630,7 @@ class Rule(CircosObject):
         self.flow = flow
         self.radius1 = radius1
         self.radius2 = radius2
+        self.overwrite = overwrite
 
 
 class Plots(object):
@@ -354,6 +748,98 @@ class Plot(CircosObjectWithFile, CircosObjectWithinRadius):
     def color(self, color):
         self.attributes["color"] = color
 
+    def compile_rules(self):
+        """
+        Evaluates the rules of the plot over its data and writes the color, show and radius they set in the options
+        of each row, then removes the rules so circos does not evaluate them for every point. The rules are left
+        untouched when one of them uses a condition or flow that cannot be compiled (see pyrcos.rules).
+
+        Returns
+        =======
+        int
+            the number of rules compiled
+        """
+        if len(self.rules) == 0:
+            return 0
+        data = read_track(self.file)
+        try:
+            data = apply_rules(data, list(self.rules), fields=track_fields(data))
+        except RuleError:
+            return 0
+
+        self.file = TrackStore.current().add(data)
+        compiled = len(self.rules)
+        self.rules = Rules([])
+        return compiled
+
+    def downsample(self, karyotypes, radius, how="mean", size=None, min_points=None):
+        """
+        Replaces the data of the plot by its values aggregated in bins.
+
+        Arguments
+        =========
+        karyotypes :
+            karyotype (or list of karyotypes) of the figure
+        radius :
+            ideogram radius in pixels, the bin size is derived from the circumference at the plot outer radius
+        how :
+            mean, max, min or sum
+        size :
+            bin size in bases (overrides the size derived from the radius)
+        min_points :
+            leave the data untouched when it has fewer rows than this
+
+        Returns
+        =======
+        int
+            the bin size used, None if the data was left untouched
+        """
+        if self.type not in BINNABLE_TYPES:
+            raise ValueError("%s plots cannot be binned" % self.type)
+
+        data = read_track(self.file)
+        if min_points is not None and len(data) <= min_points:
+            return None
+        if size is None:
+            size = bin_size(karyotypes, self._outer_radius(radius))
+
+        self.file = TrackStore.current().add(bin_track(data, size, how))
+        return size
+
+    def envelope(self, karyotypes, radius, size=None):
+        """
+        Minimum and maximum of the values in bins, as two copies of the plot (e.g. two Line plots drawing the range
+        of a dense track).
+
+        Arguments
+        =========
+        karyotypes :
+            karyotype (or list of karyotypes) of the figure
+        radius :
+            ideogram radius in pixels, the bin size is derived from the circumference at the plot outer radius
+        size :
+            bin size in bases (overrides the size derived from the radius)
+
+        Returns
+        =======
+        tuple
+            the lower and upper plots
+        """
+        if self.type not in BINNABLE_TYPES:
+            raise ValueError("%s plots cannot be binned" % self.type)
+
+        if size is None:
+            size = bin_size(karyotypes, self._outer_radius(radius))
+        lower, upper = bin_envelope(read_track(self.file), size)
+        return self.with_file(lower), self.with_file(upper)
+
+    def _outer_radius(self, radius):
+        # r1 is relative to the ideogram radius but may also be a circos expression
+        try:
+            return radius * float(self.r1)
+        except (TypeError, ValueError):
+            return radius
+
 
 class Heatmap(Plot):
     def __init__(self, file, r0, r1, backgrounds=None, axes=None, rules=None, orientation=None,
@@ -526,6 +1012,19 @@ class Text(Plot):
         super(Text, self).__init__("text", file, r0, r1, **kwargs)
 
 
+def _bases(distance, chromosomes_units=None):
+    # a circos distance (e.g. 0.5u, 100b or a number of bases) in bases
+    text = str(distance).strip()
+    try:
+        if text.endswith("u"):
+            if chromosomes_units is None:
+                raise ValueError("chromosomes_units is needed to convert %s to bases" % text)
+            return int(round(float(text[:-1]) * float(chromosomes_units)))
+        return int(round(float(text[:-1] if text.endswith("b") else text)))
+    except (TypeError, ValueError) as error:
+        raise ValueError("Cannot convert %s to bases: %s" % (text, error))
+
+
 class Tile(Plot):
     def __init__(self, file, r0, r1, backgrounds=None, axes=None, rules=None, layers=None, color=None,
                  stroke_color=None, stroke_thickness=None, margin=None, orientation=None, layers_overflow=None,
@@ -544,6 +1043,54 @@ class Tile(Plot):
                                    padding=padding,
                                    thickness=thickness
                                    )
+
+    def pack(self, chromosomes_units=None, margin=None):
+        """
+        Computes the layer of every tile and writes it as layer=N in the options of the data, so circos does not
+        have to. Tiles closer than the margin of the plot are put on different layers, as circos does.
+
+        The layers beyond the layers of the plot follow layers_overflow: with hide (the default) their tiles are
+        dropped, with collapse they are moved to the first layer and with grow they are kept, circos adds the
+        layers they need.
+
+        Arguments
+        =========
+        chromosomes_units :
+            the chromosomes_units of the figure, needed to convert a margin given in u (the default margin is 1u)
+        margin :
+            minimum distance between two tiles of the same layer, in bases or as a string with u or b units
+            (defaults to the margin of the plot)
+
+        Returns
+        =======
+        int
+            the number of tiles that do not fit in the layers of the plot
+
+        Raises
+        ======
+        ValueError
+            when the margin cannot be converted to bases, e.g. it is in u without chromosomes_units or in pixels
+        """
+        margin = _bases(self.margin if margin is None else margin, chromosomes_units)
+        data = read_track(self.file)
+        layers = pack_layers(data, margin=margin)
+        overflow = layers >= int(self.layers)
+        if self.layers_overflow == "hide":
+            data, layers = data[~overflow], layers[~overflow]
+        elif self.layers_overflow == "collapse":
+            layers = np.where(overflow, 0, layers)
+
+        # the options are the last column, after the value when there is one
+        fields = track_fields(data)
+        options = np.char.add("layer=", layers.astype(str)).astype(object)
+        if data.shape[1] > fields:
+            options = _merge_options(data.iloc[:, fields].fillna("").astype(str).values, options)
+        data = data.iloc[:, 0:fields].reset_index(drop=True)
+        data.columns = ["chromosome", "start", "end", "value"][0:fields]
+        data["options"] = options.astype(str)
+        self.file = TrackStore.current().add(data)
+        return int(overflow.sum())
+
     @property
     def color(self):
         return self.attributes.get("color", "grey")
@@ -578,7 +1125,9 @@ class Tile(Plot):
 
     @property
     def layers(self):
-        return self.attributes.get("layers", 10)
+        # None is also written to the configuration when the argument is not given
+        value = self.attributes.get("layers")
+        return 10 if value is None else value
 
     @layers.setter
     def layers(self, layers):
@@ -586,7 +1135,8 @@ class Tile(Plot):
 
     @property
     def layers_overflow(self):
-        return self.attributes.get("layers_overflow", "hide")
+        value = self.attributes.get("layers_overflow")
+        return "hide" if value is None else value
 
     @layers_overflow.setter
     def layers_overflow(self, layers_overflow):
@@ -594,7 +1144,8 @@ class Tile(Plot):
 
     @property
     def margin(self):
-        return self.attributes.get("margin", "1u")
+        value = self.attributes.get("margin")
+        return "1u" if value is None else value
 
     @margin.setter
     def margin(self, margin):
@@ -0,0 +1,152 @@
+import os
+import time
+import tracemalloc
+from collections import OrderedDict, namedtuple
+
+PhaseRecord = namedtuple("PhaseRecord", ["phase", "name", "seconds", "self_seconds", "peak_memory", "bytes_written",
+                                         "depth"])
+
+_active = None
+
+
+class _NullPhase(object):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def written(self, path=None, size=None):
+        pass
+
+
+_NULL_PHASE = _NullPhase()
+
+
+def phase(phase, name=None, *args):
+    """
+    Context manager measuring a phase with the active Profiler, it does nothing when no profiler is active.
+
+    Arguments
+    =========
+    phase :
+        kind of work (e.g. configuration, track, karyotype, circos)
+    name :
+        what the work is done for (e.g. a plot or a file), or a function building it from args which is only called
+        when a profiler is active
+    """
+    if _active is None:
+        return _NULL_PHASE
+    return _Phase(_active, phase, name(*args) if callable(name) else name)
+
+
+class _Phase(object):
+    def __init__(self, profiler, phase, name):
+        self.profiler = profiler
+        self.phase = phase
+        self.name = name
+        self.bytes_written = 0
+        self.peak_memory = 0
+        self.child_seconds = 0
+
+    def written(self, path=None, size=None):
+        if size is None:
+            size = os.path.getsize(path)
+        self.bytes_written += size
+
+    def __enter__(self):
+        stack = self.profiler._stack
+        if self.profiler.memory:
+            if len(stack) > 0:
+                stack[-1].peak_memory = max(stack[-1].peak_memory, tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+        stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        seconds = time.perf_counter() - self.start
+        stack = self.profiler._stack
+        stack.pop()
+        if len(stack) > 0:
+            stack[-1].child_seconds += seconds
+        if self.profiler.memory:
+            self.peak_memory = max(self.peak_memory, tracemalloc.get_traced_memory()[1])
+            if len(stack) > 0:
+                stack[-1].peak_memory = max(stack[-1].peak_memory, self.peak_memory)
+        self.profiler._record(PhaseRecord(self.phase, self.name, seconds, seconds - self.child_seconds,
+                                          self.peak_memory, self.bytes_written, len(stack)))
+        return False
+
+
+class Profiler(object):
+    """
+    Records the wall time, peak Python memory and bytes written of each phase of a render.
+
+        with Profiler(memory=True) as profiler:
+            circos.save("figure.svg")
+        print(profiler.report())
+
+    Arguments
+    =========
+    memory :
+        trace the peak memory with tracemalloc (slows Python down while active)
+    hooks :
+        callables called with every PhaseRecord as it completes
+    """
+
+    def __init__(self, memory=False, hooks=None):
+        self.memory = memory
+        self.hooks = list(hooks) if hooks is not None else []
+        self.records = []
+        self._stack = []
+        self._previous = None
+        self._started_tracing = False
+
+    def _record(self, record):
+        self.records.append(record)
+        for hook in self.hooks:
+            hook(record)
+
+    def __enter__(self):
+        global _active
+        self._previous = _active
+        _active = self
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        return self
+
+    def __exit__(self, *args):
+        global _active
+        _active = self._previous
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+        return False
+
+    def summary(self):
+        """
+        Seconds (excluding nested phases), peak memory, bytes written and count per phase.
+        """
+        summary = OrderedDict()
+        for record in self.records:
+            seconds, peak_memory, bytes_written, count = summary.get(record.phase, (0, 0, 0, 0))
+            summary[record.phase] = (seconds + record.self_seconds, max(peak_memory, record.peak_memory),
+                                     bytes_written + record.bytes_written, count + 1)
+        return summary
+
+    def slowest(self, n=10, phase=None):
+        records = [r for r in self.records if phase is None or r.phase == phase]
+        return sorted(records, key=lambda r: r.seconds, reverse=True)[0:n]
+
+    def report(self, n=10):
+        lines = ["%-16s %6s %10s %12s %12s" % ("phase", "count", "seconds", "peak memory", "written")]
+        for phase_name, (seconds, peak_memory, bytes_written, count) in self.summary().items():
+            lines.append("%-16s %6i %10.4f %12i %12i" % (phase_name, count, seconds, peak_memory, bytes_written))
+
+        lines.append("")
+        lines.append("slowest:")
+        for record in self.slowest(n):
+            lines.append("%-16s %10.4f %s" % (record.phase, record.seconds, record.name))
+        return "\n".join(lines)
@@ -0,0 +1,169 @@
+import hashlib
+import inspect
+import json
+import os
+from collections import OrderedDict, namedtuple
+
+from pyrcos.cache import configuration_key, file_hash
+from pyrcos.cmd import output_path, render_many, workspace
+
+UP_TO_DATE = "up-to-date"
+UNCHANGED = "unchanged"
+RENDERED = "rendered"
+FAILED = "failed"
+
+BuildResult = namedtuple("BuildResult", ["output", "status", "render"])
+
+
+class ProjectFigure(namedtuple("ProjectFigure", ["output", "build", "sources", "parameters", "format"])):
+    """
+    A figure of a Project.
+
+    Arguments
+    =========
+    output :
+        output file, relative to the project directory
+    build :
+        callable returning the Circos object, called with the parameters as keyword arguments
+    sources :
+        input files the figure is built from (GenBank, PaxDb, RegulonDB...)
+    parameters :
+        dict of Python side parameters passed to build
+    format :
+        png or svg
+    """
+
+    def parameters_key(self):
+        try:
+            code = inspect.getsource(self.build)
+        except (OSError, TypeError):
+            code = getattr(self.build, "__qualname__", repr(self.build))
+        text = json.dumps(self.parameters, sort_keys=True, default=repr) + code
+        return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+class Project(object):
+    """
+    Incremental build of many figures.
+
+    For every output the project records the hashes of its source files, of its parameters (and build function)
+    and of its rendered configuration including the data and karyotype files. On build, figures whose sources
+    and parameters did not change are not even built, figures whose configuration did not change are not
+    rendered, and the remaining ones are rendered in parallel.
+
+        project = Project("figures")
+
+        @project.figure("strain1.svg", sources=["strain1.gbk"], parameters=dict(strain="strain1"))
+        def strain_figure(strain):
+            ...
+            return Circos(...)
+
+        project.build()
+
+    Arguments
+    =========
+    directory :
+        directory outputs are relative to
+    manifest :
+        file where the dependencies of every output are recorded, relative to directory
+    circos_path, max_workers, timeout :
+        passed to pyrcos.cmd.render_many
+    """
+
+    def __init__(self, directory=".", manifest=".pyrcos-build.json", circos_path=None, max_workers=None,
+                 timeout=None):
+        self.directory = directory
+        self.manifest = os.path.join(directory, manifest)
+        self.circos_path = circos_path
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.figures = OrderedDict()
+
+    def add(self, output, build, sources=(), parameters=None, format="svg"):
+        self.figures[output] = ProjectFigure(output, build, list(sources), parameters or {}, format)
+
+    def figure(self, output, sources=(), parameters=None, format="svg"):
+        """
+        Decorator registering a build function for output.
+        """
+        def register(build):
+            self.add(output, build, sources=sources, parameters=parameters, format=format)
+            return build
+        return register
+
+    def _read_manifest(self):
+        if not os.path.isfile(self.manifest):
+            return {}
+        with open(self.manifest) as fr:
+            return json.load(fr)
+
+    def _write_manifest(self, manifest):
+        temp = self.manifest + ".tmp"
+        with open(temp, "w") as fw:
+            json.dump(manifest, fw, indent=1, sort_keys=True)
+        os.replace(temp, self.manifest)
+
+    def _path(self, figure):
+        return os.path.join(self.directory, figure.output)
+
+    def build(self, force=False):
+        """
+        Builds the figures whose inputs changed.
+
+        Returns
+        =======
+        list
+            one BuildResult per figure, status is up-to-date, unchanged (rebuilt but the configuration and data
+            are identical), rendered or failed
+        """
+        manifest = self._read_manifest()
+        hashes = {}
+
+        def source_hash(path):
+            # sources are usually shared by many figures
+            if path not in hashes:
+                hashes[path] = file_hash(path)
+            return hashes[path]
+
+        results = OrderedDict()
+        jobs = []
+        pending = []
+        for output, figure in self.figures.items():
+            recorded = manifest.get(output, {})
+            sources = {path: source_hash(path) for path in figure.sources}
+            parameters = figure.parameters_key()
+            exists = os.path.isfile(output_path(self._path(figure), figure.format))
+            if not force and exists and recorded.get("sources") == sources and \
+                    recorded.get("parameters") == parameters:
+                results[output] = BuildResult(output, UP_TO_DATE, None)
+                continue
+
+            circos_object = figure.build(**figure.parameters)
+            with workspace(circos_object):
+                key = configuration_key(str(circos_object))
+            entry = dict(sources=sources, parameters=parameters, configuration=key, format=figure.format)
+            if not force and exists and recorded.get("configuration") == key:
+                manifest[output] = entry
+                results[output] = BuildResult(output, UNCHANGED, None)
+                continue
+
+            jobs.append((circos_object, self._path(figure)))
+            pending.append((output, entry, figure.format))
+
+        # render_many renders every configuration again, cached blocks make this cheap
+        by_format = OrderedDict()
+        for job, item in zip(jobs, pending):
+            by_format.setdefault(item[2], []).append((job, item))
+        for format, items in by_format.items():
+            renders = render_many([job for job, _ in items], circos_path=self.circos_path, format=format,
+                                  max_workers=self.max_workers, timeout=self.timeout)
+            for render, (_, (output, entry, _)) in zip(renders, items):
+                if render.ok:
+                    manifest[output] = entry
+                    results[output] = BuildResult(output, RENDERED, render)
+                else:
+                    manifest.pop(output, None)
+                    results[output] = BuildResult(output, FAILED, render)
+
+        self._write_manifest(manifest)
+        return [results[output] for output in self.figures]
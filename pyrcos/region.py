@@ -0,0 +1,105 @@
+import numpy as np
+
+from pyrcos.tracks import TrackStore, read_track
+
+
+class IntervalIndex(object):
+    """
+    Intervals sorted by start within each chromosome, queried with binary search.
+
+    Arguments
+    =========
+    chromosomes, starts, ends :
+        one entry per interval
+    """
+
+    def __init__(self, chromosomes, starts, ends):
+        chromosomes = np.asarray(chromosomes).astype(str)
+        starts = np.asarray(starts, dtype=np.int64)
+        ends = np.asarray(ends, dtype=np.int64)
+
+        self.order = np.lexsort((starts, chromosomes))
+        sorted_chromosomes = chromosomes[self.order]
+        self.starts = starts[self.order]
+        self.ends = ends[self.order]
+        names, first = np.unique(sorted_chromosomes, return_index=True)
+        last = np.append(first[1:], len(sorted_chromosomes))
+        self.bounds = {name: (f, l) for name, f, l in zip(names.tolist(), first, last)}
+
+        # running maximum of the ends within each chromosome, non decreasing so it can be searched too
+        self.max_ends = np.empty_like(self.ends)
+        for f, l in self.bounds.values():
+            self.max_ends[f:l] = np.maximum.accumulate(self.ends[f:l])
+
+    def __len__(self):
+        return len(self.order)
+
+    def query(self, chromosome, start, end):
+        """
+        Positions (in the original order) of the intervals overlapping [start, end] on chromosome, sorted.
+        """
+        if chromosome not in self.bounds:
+            return np.array([], dtype=np.int64)
+        first, last = self.bounds[chromosome]
+        left = first + np.searchsorted(self.max_ends[first:last], start, side="left")
+        right = first + np.searchsorted(self.starts[first:last], end, side="right")
+        if right <= left:
+            return np.array([], dtype=np.int64)
+        overlapping = self.ends[left:right] >= start
+        return np.sort(self.order[left:right][overlapping])
+
+    def select(self, regions):
+        """
+        Positions of the intervals overlapping any of the (chromosome, start, end) regions, sorted.
+        """
+        if len(regions) == 0:
+            return np.array([], dtype=np.int64)
+        return np.unique(np.concatenate([self.query(*region) for region in regions]))
+
+
+def track_index(file, offset=0):
+    """
+    IntervalIndex over the chromosome, start and end columns starting at column offset of a track, kept on the
+    file so zooming again does not sort the data again.
+    """
+    indexes = file.__dict__.setdefault("_indexes", {})
+    if offset not in indexes:
+        data = read_track(file)
+        indexes[offset] = IntervalIndex(data.iloc[:, offset], data.iloc[:, offset + 1], data.iloc[:, offset + 2])
+    return indexes[offset]
+
+
+def slice_track(file, regions):
+    """
+    The rows of a track overlapping the regions, as a file of the current TrackStore.
+    """
+    rows = track_index(file).select(regions)
+    return TrackStore.current().add(read_track(file).iloc[rows].reset_index(drop=True))
+
+
+def slice_links(file, regions):
+    """
+    The links of a track with both ends in the regions, as a file of the current TrackStore.
+    """
+    rows = np.intersect1d(track_index(file, 0).select(regions), track_index(file, 3).select(regions))
+    return TrackStore.current().add(read_track(file).iloc[rows].reset_index(drop=True))
+
+
+def slice_karyotype(karyotype, regions):
+    """
+    Karyotype reduced to the chromosomes of the regions, each spanning its regions, and the bands overlapping them.
+    """
+    spans = {}
+    for chromosome, start, end in regions:
+        span = spans.get(chromosome, (start, end))
+        spans[chromosome] = (min(span[0], start), max(span[1], end))
+
+    chromosome_ids = np.where(karyotype.kinds == "chr", karyotype.ids, karyotype.parents)
+    span_starts = np.array([spans.get(c, (0, -1))[0] for c in chromosome_ids.tolist()], dtype=np.int64)
+    span_ends = np.array([spans.get(c, (0, -1))[1] for c in chromosome_ids.tolist()], dtype=np.int64)
+    keep = (karyotype.stops >= span_starts) & (karyotype.starts <= span_ends)
+
+    return karyotype.__class__.from_arrays(karyotype.ids[keep], karyotype.labels[keep],
+                                           np.maximum(karyotype.starts, span_starts)[keep],
+                                           np.minimum(karyotype.stops, span_ends)[keep], karyotype.colors[keep],
+                                           kinds=karyotype.kinds[keep], parents=karyotype.parents[keep])
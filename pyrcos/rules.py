@@ -0,0 +1,278 @@
+import operator
+import re
+
+import numpy as np
+
+_TOKEN = re.compile(r"\s*(?:(?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)|(?P<string>\"[^\"]*\"|'[^']*')|"
+                    r"(?P<operator>==|!=|>=|<=|&&|\|\||[<>!()+\-*/,])|(?P<name>[A-Za-z_][A-Za-z_0-9]*))")
+
+_COMPARISONS = {"==": operator.eq, "!=": operator.ne, ">": operator.gt, "<": operator.lt, ">=": operator.ge,
+                "<=": operator.le, "eq": operator.eq, "ne": operator.ne, "gt": operator.gt, "lt": operator.lt,
+                "ge": operator.ge, "le": operator.le}
+_ARITHMETIC = {"+": operator.add, "-": operator.sub, "*": operator.mul, "/": operator.truediv}
+VARIABLES = ("chr", "start", "end", "size", "value")
+
+
+class RuleError(ValueError):
+    """
+    A rule that cannot be evaluated in Python and has to be left to circos.
+    """
+
+
+def _tokenize(condition):
+    tokens = []
+    position = 0
+    condition = condition.strip()
+    while position < len(condition):
+        match = _TOKEN.match(condition, position)
+        if match is None or match.end() == position:
+            raise RuleError("Cannot compile rule condition %r at %r" % (condition, condition[position:]))
+        position = match.end()
+        kind = match.lastgroup
+        text = match.group(kind)
+        if kind == "number":
+            tokens.append(("value", float(text)))
+        elif kind == "string":
+            tokens.append(("value", text[1:-1]))
+        else:
+            tokens.append((kind, text))
+    return tokens
+
+
+class _Parser(object):
+    # recursive descent over the circos (perl) condition subset, every method returns a function of the columns
+
+    def __init__(self, condition):
+        self.condition = condition
+        self.tokens = _tokenize(condition)
+        self.position = 0
+
+    def error(self, message):
+        return RuleError("Cannot compile rule condition %r: %s" % (self.condition, message))
+
+    def peek(self):
+        return self.tokens[self.position][1] if self.position < len(self.tokens) else None
+
+    def next(self):
+        if self.position >= len(self.tokens):
+            raise self.error("unexpected end")
+        token = self.tokens[self.position]
+        self.position += 1
+        return token
+
+    def expect(self, text):
+        kind, value = self.next()
+        if value != text:
+            raise self.error("expected %s" % text)
+
+    def parse(self):
+        expression = self.disjunction()
+        if self.position != len(self.tokens):
+            raise self.error("unexpected %s" % self.peek())
+        return expression
+
+    def disjunction(self):
+        left = self.conjunction()
+        while self.peek() in ("||", "or"):
+            self.next()
+            left = _binary(np.logical_or, left, self.conjunction())
+        return left
+
+    def conjunction(self):
+        left = self.negation()
+        while self.peek() in ("&&", "and"):
+            self.next()
+            left = _binary(np.logical_and, left, self.negation())
+        return left
+
+    def negation(self):
+        if self.peek() in ("!", "not"):
+            self.next()
+            operand = self.negation()
+            return lambda columns: np.logical_not(operand(columns))
+        return self.comparison()
+
+    def comparison(self):
+        left = self.sum()
+        if self.peek() in _COMPARISONS:
+            return _binary(_COMPARISONS[self.next()[1]], left, self.sum())
+        return left
+
+    def sum(self):
+        left = self.product()
+        while self.peek() in ("+", "-"):
+            left = _binary(_ARITHMETIC[self.next()[1]], left, self.product())
+        return left
+
+    def product(self):
+        left = self.unary()
+        while self.peek() in ("*", "/"):
+            left = _binary(_ARITHMETIC[self.next()[1]], left, self.unary())
+        return left
+
+    def unary(self):
+        if self.peek() == "-":
+            self.next()
+            operand = self.unary()
+            return lambda columns: operator.neg(operand(columns))
+        return self.primary()
+
+    def primary(self):
+        kind, value = self.next()
+        if kind == "value":
+            return lambda columns: value
+        if value == "(":
+            expression = self.disjunction()
+            self.expect(")")
+            return expression
+        if kind == "name" and value == "var":
+            return self.variable()
+        if kind == "name" and value == "on":
+            return self.on()
+        raise self.error("unsupported %s" % value)
+
+    def arguments(self):
+        self.expect("(")
+        arguments = [self.next()[1]]
+        while self.peek() == ",":
+            self.next()
+            arguments.append(self.next()[1])
+        self.expect(")")
+        return arguments
+
+    def variable(self):
+        arguments = self.arguments()
+        if len(arguments) != 1 or arguments[0] not in VARIABLES:
+            raise self.error("unsupported variable %s" % ", ".join(str(a) for a in arguments))
+        name = arguments[0]
+        return lambda columns: _column(columns, name)
+
+    def on(self):
+        arguments = self.arguments()
+        if len(arguments) not in (1, 3):
+            raise self.error("on takes a chromosome and optionally a start and an end")
+        chromosome = str(arguments[0])
+        if len(arguments) == 1:
+            return lambda columns: _column(columns, "chr") == chromosome
+        start, end = float(arguments[1]), float(arguments[2])
+        return lambda columns: ((_column(columns, "chr") == chromosome) & (_column(columns, "end") >= start) &
+                                (_column(columns, "start") <= end))
+
+
+def _binary(function, left, right):
+    return lambda columns: function(left(columns), right(columns))
+
+
+def _column(columns, name):
+    if name not in columns:
+        raise RuleError("The track has no %s column" % name)
+    return columns[name]
+
+
+def compile_condition(condition):
+    """
+    Compiles a circos rule condition into a function of the track columns (see track_columns) returning the
+    matching rows as a boolean array.
+
+    Supports var(chr|start|end|size|value), on(chromosome) and on(chromosome, start, end), numbers and strings,
+    arithmetic, comparisons (==, !=, <, >, <=, >=, eq, ne, lt, gt, le, ge) and boolean combinations (&&, ||, !,
+    and, or, not). Anything else raises a RuleError.
+    """
+    if isinstance(condition, bool):
+        condition = str(int(condition))
+    expression = _Parser(str(condition)).parse()
+
+    def evaluate(columns):
+        result = expression(columns)
+        return np.broadcast_to(np.asarray(result).astype(bool), (len(columns["chr"]),))
+
+    return evaluate
+
+
+def track_columns(data, fields=4):
+    """
+    The columns of a track a condition refers to, fields is the number of positional columns (3 when there is
+    no value).
+    """
+    columns = dict(chr=np.asarray(data.iloc[:, 0]).astype(str),
+                   start=np.asarray(data.iloc[:, 1], dtype=np.int64),
+                   end=np.asarray(data.iloc[:, 2], dtype=np.int64))
+    columns["size"] = columns["end"] - columns["start"] + 1
+    if fields > 3:
+        columns["value"] = np.asarray(data.iloc[:, 3], dtype=float)
+    return columns
+
+
+def _format(value):
+    if isinstance(value, bool):
+        return "yes" if value else "no"
+    return str(value)
+
+
+def apply_rules(data, rules, fields=4):
+    """
+    Evaluates rules over a track, with the circos semantics: the first matching rule applies to each row and
+    stops the evaluation unless its flow is continue. A later matching rule only changes the parameters that are
+    not set yet, unless it has overwrite.
+
+    Arguments
+    =========
+    data :
+        DataFrame with the positional columns, optionally followed by an options column
+    rules :
+        list of Rule
+    fields :
+        the number of positional columns of the track, 4 with a value and 3 without (see
+        pyrcos.tracks.track_fields)
+
+    Returns
+    =======
+    DataFrame
+        the positional columns and an options column with the color, show and radius of the matching rules
+
+    Raises
+    ======
+    RuleError
+        when a rule cannot be compiled, in which case all rules have to be left to circos
+    """
+    conditions = []
+    for rule in rules:
+        if rule.flow not in (None, "continue", "stop"):
+            raise RuleError("Cannot compile rule flow %s" % rule.flow)
+        conditions.append(compile_condition(rule.condition))
+
+    columns = track_columns(data, fields)
+    rows = len(data)
+    pending = np.ones(rows, dtype=bool)
+    matches = []
+    for rule, condition in zip(rules, conditions):
+        matched = pending & condition(columns)
+        matches.append(matched)
+        if rule.flow != "continue":
+            pending &= ~matched
+
+    options = np.full(rows, "", dtype=object)
+    for name in ("color", "show", "radius1", "radius2"):
+        values = np.full(rows, "", dtype=object)
+        for rule, matched in zip(rules, matches):
+            if getattr(rule, name) is not None:
+                # the first rule setting a parameter wins unless a later one overwrites it
+                assigned = matched if rule.overwrite else matched & (values == "")
+                values[assigned] = "%s=%s" % (name, _format(getattr(rule, name)))
+        options = np.where((options != "") & (values != ""), options + "," + values, options + values)
+
+    if data.shape[1] > fields:
+        options = _merge_options(data.iloc[:, fields].fillna("").astype(str).values, options)
+    table = data.iloc[:, 0:fields].reset_index(drop=True)
+    table["options"] = options.astype(str)
+    return table
+
+
+def _merge_options(existing, options):
+    # rule options replace the options of the data with the same name
+    merged = np.where(options == "", existing, np.where(existing == "", options, None))
+    for i in np.flatnonzero(np.equal(merged, None)):
+        names = set(option.split("=", 1)[0] for option in options[i].split(","))
+        kept = [option for option in existing[i].split(",") if option.split("=", 1)[0] not in names]
+        merged[i] = ",".join(kept + [options[i]])
+    return merged
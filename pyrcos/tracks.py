@@ -0,0 +1,224 @@
+import atexit
+import contextvars
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import weakref
+
+import numpy as np
+from pandas import DataFrame, read_csv
+from pandas.api.types import is_numeric_dtype
+from pandas.util import hash_pandas_object
+
+from pyrcos.profiling import phase
+
+_lock = threading.Lock()
+
+
+def track_hash(data):
+    """
+    Content hash of a DataFrame, a numpy (structured) array or a text.
+    """
+    digest = hashlib.sha1()
+    if isinstance(data, str):
+        digest.update(data.encode("utf-8"))
+    elif isinstance(data, DataFrame):
+        digest.update(str([str(dtype) for dtype in data.dtypes]).encode("utf-8"))
+        digest.update(hash_pandas_object(data, index=False).values.tobytes())
+    elif isinstance(data, np.ndarray) and not data.dtype.hasobject:
+        digest.update(str(data.dtype.descr).encode("utf-8"))
+        digest.update(str(data.shape).encode("utf-8"))
+        digest.update(np.ascontiguousarray(data).tobytes())
+    elif isinstance(data, np.ndarray):
+        return track_hash(DataFrame(data))
+    else:
+        raise TypeError("Cannot hash track of type %s" % type(data))
+    return digest.hexdigest()
+
+
+def _text_array(data):
+    # bytes fields would be written as b'...'
+    if data.dtype.names is None:
+        return data.astype(str) if data.dtype.kind == "S" else data
+    descr = [(name, "U%i" % data.dtype[name].itemsize if data.dtype[name].kind == "S" else data.dtype[name])
+             for name in data.dtype.names]
+    return data.astype(descr)
+
+
+def write_track(data, path):
+    """
+    Writes a DataFrame or a numpy (structured) array as a tab separated circos data file, texts are written as
+    they are.
+    """
+    if isinstance(data, str):
+        with open(path, "w") as fw:
+            fw.write(data)
+    elif isinstance(data, DataFrame):
+        data.to_csv(path, sep="\t", index=False, header=False)
+    elif isinstance(data, np.ndarray):
+        data = _text_array(data)
+        if data.dtype.names is None:
+            np.savetxt(path, np.atleast_2d(data), fmt="%s", delimiter="\t")
+        else:
+            np.savetxt(path, data, fmt="\t".join(["%s"] * len(data.dtype.names)))
+    else:
+        raise TypeError("Cannot write track of type %s" % type(data))
+
+
+def read_track(file):
+    """
+    Data of a track as a DataFrame, read from disk unless the file keeps the data it was written from.
+    """
+    data = getattr(file, "data", None)
+    if data is None:
+        return read_csv(file.name, sep=r"\s+", header=None, comment="#")
+    if isinstance(data, np.ndarray):
+        return DataFrame(_text_array(data))
+    return data
+
+
+def track_fields(data):
+    """
+    The number of positional columns of a track table: 4 when the fourth column is a (numeric) value, 3 when the
+    track has no value and the fourth column, if any, holds the options (e.g. tiles or highlights).
+    """
+    if data.shape[1] > 4 or (data.shape[1] == 4 and is_numeric_dtype(data.iloc[:, 3])):
+        return 4
+    return 3
+
+
+class TrackFile(object):
+    """
+    A data file, plots sharing the same data share the same TrackFile.
+
+    Files built from data are only written (materialized) while a render needs them: every materialize call
+    must be paired with a release call, the file is removed when the last user releases it. No file descriptor is
+    kept open between renders. Files given as paths (data is None) are never written nor removed.
+
+    Arguments
+    =========
+    name :
+        path of the file
+    key :
+        content hash of the data
+    data :
+        the DataFrame, array or text written to the file
+    kind :
+        phase name used when profiling the write
+    """
+
+    def __init__(self, name, key=None, data=None, kind="track"):
+        self.name = name
+        self.key = key
+        self.data = data
+        self.kind = kind
+        self._users = 0
+        self._written = False
+
+    def __str__(self):
+        return self.name
+
+    def materialize(self):
+        if self.data is None:
+            return
+        with _lock:
+            if self._users == 0 and not os.path.exists(self.name):
+                directory = os.path.dirname(self.name)
+                if not os.path.isdir(directory):
+                    os.makedirs(directory)
+                with phase(self.kind, self.name) as measure:
+                    write_track(self.data, self.name)
+                    measure.written(self.name)
+                self._written = True
+            self._users += 1
+
+    def release(self):
+        if self.data is None:
+            return
+        with _lock:
+            self._users = max(0, self._users - 1)
+            if self._users == 0 and self._written:
+                if os.path.exists(self.name):
+                    os.remove(self.name)
+                self._written = False
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state["_users"] = 0
+        state["_written"] = False
+        return state
+
+
+class TrackStore(object):
+    """
+    Keeps each distinct track once, under its content hash, in a workspace directory.
+
+    Plots built inside a `with TrackStore():` block use that store, otherwise a process wide default store is used
+    (see set_default). The block only applies to the thread (or asyncio task) that entered it. Files are only written while a figure is rendered, see TrackFile. The store only holds weak
+    references, a track is forgotten once no plot uses it.
+
+    Arguments
+    =========
+    directory :
+        workspace directory, a temporary directory removed at exit is created when not given
+    tmpfs :
+        create the temporary directory in /dev/shm when available
+    """
+    _active = contextvars.ContextVar("active_track_stores", default=())
+    _default = None
+
+    def __init__(self, directory=None, tmpfs=False):
+        self._directory = directory
+        self.tmpfs = tmpfs
+        self.files = weakref.WeakValueDictionary()
+
+    @property
+    def directory(self):
+        if self._directory is None:
+            parent = "/dev/shm" if self.tmpfs and os.path.isdir("/dev/shm") else None
+            self._directory = tempfile.mkdtemp(prefix="pyrcos-", dir=parent)
+            atexit.register(shutil.rmtree, self._directory, True)
+        return self._directory
+
+    def add(self, data, kind="track"):
+        key = track_hash(data)
+        file = self.files.get(key)
+        if file is None:
+            # the file is named after the data as it is now, later changes of the caller's data must not reach it
+            if isinstance(data, (DataFrame, np.ndarray)):
+                data = data.copy()
+            file = TrackFile(os.path.join(self.directory, "%s.txt" % key), key, data, kind=kind)
+            self.files[key] = file
+        return file
+
+    def __len__(self):
+        return len(self.files)
+
+    def close(self):
+        if self._directory is not None and os.path.isdir(self._directory):
+            shutil.rmtree(self._directory)
+        self.files = weakref.WeakValueDictionary()
+
+    def __enter__(self):
+        TrackStore._active.set(TrackStore._active.get() + (self,))
+        return self
+
+    def __exit__(self, *args):
+        active = TrackStore._active.get()
+        last = len(active) - 1 - active[::-1].index(self)
+        TrackStore._active.set(active[:last] + active[last + 1:])
+
+    @classmethod
+    def current(cls):
+        active = cls._active.get()
+        if len(active) > 0:
+            return active[-1]
+        if cls._default is None:
+            cls._default = TrackStore()
+        return cls._default
+
+    @classmethod
+    def set_default(cls, store):
+        cls._default = store
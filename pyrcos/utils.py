@@ -1,32 +1,383 @@
+import gzip
+import io
+import os
+import re
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from Bio import SeqIO
 from Bio.SeqRecord import SeqRecord
 from pandas import DataFrame
-from pyrcos.objects import KaryotypeChromosome, Karyotype
+from pyrcos.objects import Karyotype
 from pyrcos.constants import DEFAUT_CHR_COLOR
 import numpy as np
 
+TILE_COLUMNS = ["chromosome", "start", "end", "value", "options"]
+HIGHLIGHT_COLUMNS = ["chromosome", "start", "end", "options"]
+FASTA_EXTENSIONS = (".fa", ".fasta", ".fna", ".ffn", ".faa", ".fas")
+GENBANK_EXTENSIONS = (".gb", ".gbk", ".gbff", ".genbank")
+
+ExtractedFeatures = namedtuple("ExtractedFeatures", ["ids", "names", "lengths", "records", "types", "starts",
+                                                     "ends"])
+ExtractedFeatures.__doc__ = """
+Columns extracted from many records: ids, names and lengths have one entry per record, records (index into ids),
+types (index into the feature types), starts and ends one entry per feature.
+"""
+
+_LOCUS_LENGTH = re.compile(r"\s(\d+)\s+(?:bp|aa)\b")
+
 
 def seq_records_to_karyotype(records, color_map={}):
     assert all([isinstance(r, SeqRecord) for r in records])
-    chrs = []
-    for i, record in enumerate(records):
-        chr = KaryotypeChromosome(record.id, record.name, 1, len(record), color_map.get(record.id, DEFAUT_CHR_COLOR))
-        chrs.append(chr)
+    return Karyotype.from_arrays([record.id for record in records],
+                                 [record.name for record in records],
+                                 np.ones(len(records), dtype=np.int64),
+                                 [len(record) for record in records],
+                                 [color_map.get(record.id, DEFAUT_CHR_COLOR) for record in records])
+
+
+def _open_sequence_file(path):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt")
+    return open(path)
+
+
+def _sequence_format(path):
+    name = path[:-3] if path.endswith(".gz") else path
+    if name.lower().endswith(FASTA_EXTENSIONS):
+        return "fasta"
+    if name.lower().endswith(GENBANK_EXTENSIONS):
+        return "genbank"
+    with _open_sequence_file(path) as handle:
+        for line in handle:
+            if line.startswith(">"):
+                return "fasta"
+            if line.startswith("LOCUS"):
+                return "genbank"
+    raise ValueError("Cannot tell the format of %s, use fasta or genbank" % path)
+
+
+def _fasta_lengths(handle):
+    identifier, length = None, 0
+    for line in handle:
+        if line.startswith(">"):
+            if identifier is not None:
+                yield identifier, identifier, length
+            identifier, length = line[1:].split(None, 1)[0], 0
+        else:
+            length += len(line.rstrip())
+    if identifier is not None:
+        yield identifier, identifier, length
+
+
+def _genbank_lengths(handle):
+    # only the header lines are looked at, the sequence is skipped until the end of the record
+    name = identifier = length = None
+    for line in handle:
+        if line.startswith("LOCUS"):
+            name = line.split()[1]
+            match = _LOCUS_LENGTH.search(line)
+            length = int(match.group(1)) if match else 0
+        elif line.startswith("VERSION") and len(line.split()) > 1:
+            identifier = line.split()[1]
+        elif line.startswith("ACCESSION") and identifier is None and len(line.split()) > 1:
+            identifier = line.split()[1]
+        elif line.startswith("//") and name is not None:
+            yield identifier or name, name, length
+            name = identifier = length = None
+
+
+def sequence_lengths(path, format=None):
+    """
+    Yields the id, name and length of every sequence of a FASTA or GenBank file (optionally gzipped), without
+    keeping the sequences in memory.
+
+    Arguments
+    =========
+    path :
+        the file to read
+    format :
+        fasta or genbank, guessed from the extension or the first line when not given
+    """
+    if format is None:
+        format = _sequence_format(path)
+    if format not in ("fasta", "genbank", "gb"):
+        raise ValueError("Unknown sequence format: %s" % format)
+
+    with _open_sequence_file(path) as handle:
+        if format == "fasta":
+            for entry in _fasta_lengths(handle):
+                yield entry
+        else:
+            for entry in _genbank_lengths(handle):
+                yield entry
+
+
+def sequence_files_to_karyotype(paths, format=None, color_map={}, min_length=None, small="merge", other="other"):
+    """
+    Builds a karyotype from the ids and lengths of the sequences of FASTA or GenBank files, streaming the files.
+
+    Arguments
+    =========
+    paths :
+        a file or a list of files
+    format :
+        fasta or genbank, guessed for each file when not given
+    color_map :
+        dict of sequence id -> color
+    min_length :
+        sequences shorter than this are merged in a single chromosome or dropped
+    small :
+        "merge" to put the short sequences in one chromosome with id other, "drop" to leave them out
+    other :
+        id and label of the chromosome with the merged sequences
+
+    Returns
+    =======
+    Karyotype
+    """
+    if small not in ("merge", "drop"):
+        raise ValueError("Unknown small sequences handling: %s, use merge or drop" % small)
+    if isinstance(paths, str):
+        paths = [paths]
+
+    ids, names, lengths = [], [], []
+    for path in paths:
+        for identifier, name, length in sequence_lengths(path, format):
+            ids.append(identifier)
+            names.append(name)
+            lengths.append(length)
+    ids, names, lengths = np.array(ids, dtype=str), np.array(names, dtype=str), np.array(lengths, dtype=np.int64)
+
+    if min_length is not None:
+        short = lengths < min_length
+        merged = int(lengths[short].sum())
+        ids, names, lengths = ids[~short], names[~short], lengths[~short]
+        if small == "merge" and merged > 0:
+            ids, names, lengths = np.append(ids, other), np.append(names, other), np.append(lengths, merged)
+
+    return Karyotype.from_arrays(ids, names, np.ones(len(ids), dtype=np.int64), lengths,
+                                 [color_map.get(identifier, DEFAUT_CHR_COLOR) for identifier in ids.tolist()])
+
+
+def _extract_features(record, feature_types):
+    # a single pass over the features filling preallocated columns; features that are not
+    # requested keep the code -1 and are masked out afterwards
+    codes = {feature_type: i for i, feature_type in enumerate(feature_types)}
+    features = record.features
+    type_codes = np.full(len(features), -1, dtype=np.int32)
+    starts = np.empty(len(features), dtype=np.int64)
+    ends = np.empty(len(features), dtype=np.int64)
+    for i, feature in enumerate(features):
+        code = codes.get(feature.type)
+        if code is None:
+            continue
+        type_codes[i] = code
+        starts[i] = int(feature.location.start) + 1
+        ends[i] = int(feature.location.end)
+
+    return type_codes, starts, ends
+
+
+def _features_table(chromosome, starts, ends, kind):
+    columns = dict(chromosome=np.full(len(starts), chromosome, dtype=object),
+                   start=starts,
+                   end=ends,
+                   value=np.ones(len(starts), dtype=np.int64),
+                   options=np.full(len(starts), "", dtype=object))
+    if kind == "tile":
+        names = TILE_COLUMNS
+    elif kind == "highlight":
+        names = HIGHLIGHT_COLUMNS
+    else:
+        raise ValueError("Unknown track kind: %s" % kind)
+
+    return DataFrame({name: columns[name] for name in names}, columns=names)
+
 
-    return Karyotype(chrs)
+def seq_record_to_feature_tables(record, feature_types=["gene"], kind="tile"):
+    """
+    Extracts the features of a record as one table per feature type.
+
+    Arguments
+    =========
+    record :
+        a SeqRecord
+    feature_types :
+        the feature types to extract (e.g. gene, CDS, tRNA, rRNA)
+    kind :
+        "tile" (chromosome, start, end, value, options) or "highlight" (chromosome, start, end, options)
+
+    Returns
+    =======
+    dict
+        feature type -> DataFrame
+    """
+    type_codes, starts, ends = _extract_features(record, feature_types)
+    tables = {}
+    for code, feature_type in enumerate(feature_types):
+        mask = type_codes == code
+        tables[feature_type] = _features_table(record.id, starts[mask], ends[mask], kind)
+
+    return tables
+
+
+def iter_feature_tables(records, feature_types=["gene"], kind="tile"):
+    """
+    Generator version of seq_records_to_feature_tables, yields the tables of one record at a time.
+    """
+    for record in records:
+        yield seq_record_to_feature_tables(record, feature_types, kind=kind)
+
+
+def seq_records_to_feature_tables(records, feature_types=["gene"], kind="tile"):
+    """
+    Extracts the features of all records, one table per feature type covering every record.
+    """
+    per_type = {feature_type: [] for feature_type in feature_types}
+    for tables in iter_feature_tables(records, feature_types, kind=kind):
+        for feature_type, table in tables.items():
+            per_type[feature_type].append(table)
+
+    columns = TILE_COLUMNS if kind == "tile" else HIGHLIGHT_COLUMNS
+    return {feature_type: _concat_tables(tables, columns) for feature_type, tables in per_type.items()}
+
+
+def _concat_tables(tables, columns):
+    if len(tables) == 0:
+        return DataFrame(columns=columns)
+    return DataFrame({name: np.concatenate([t[name].values for t in tables]) for name in columns}, columns=columns)
 
 
 def seq_record_to_tiles(records, feature_types=["gene"]):
     for record in records:
-        track = DataFrame(columns=["chromosome", "start", "end", "value", "options"])
-        i = 0
-        for feature in record.features:
-            if feature.type in feature_types:
-                track.loc[i] = (record.id, int(feature.location.start+1),
-                                           int(feature.location.end),
-                                           1, "")
-                i += 1
-
-        track["start"] = np.array(track["start"], dtype=int)
-        track["end"] = np.array(track["end"], dtype=int)
-
-        yield track
\ No newline at end of file
+        type_codes, starts, ends = _extract_features(record, feature_types)
+        mask = type_codes >= 0
+        yield _features_table(record.id, starts[mask], ends[mask], "tile")
+
+
+def _records_columns(records, feature_types):
+    ids, names, lengths, columns = [], [], [], []
+    for i, record in enumerate(records):
+        ids.append(record.id)
+        names.append(record.name)
+        lengths.append(len(record))
+        type_codes, starts, ends = _extract_features(record, feature_types)
+        mask = type_codes >= 0
+        columns.append((np.full(mask.sum(), i, dtype=np.int32), type_codes[mask].astype(np.int8), starts[mask],
+                        ends[mask]))
+    return _concat_columns(ids, names, lengths, columns)
+
+
+def _concat_columns(ids, names, lengths, columns):
+    if len(columns) == 0:
+        columns = [(np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int8), np.empty(0, dtype=np.int64),
+                    np.empty(0, dtype=np.int64))]
+    return ExtractedFeatures(np.array(ids, dtype=str), np.array(names, dtype=str), np.array(lengths, dtype=np.int64),
+                             *[np.concatenate(column) for column in zip(*columns)])
+
+
+_RECORD_STARTS = {"genbank": b"LOCUS", "gb": b"LOCUS", "fasta": b">"}
+
+
+def _file_columns(path, feature_types, format, start=None, end=None):
+    # runs in the worker processes, only the arrays are sent back
+    if start is None:
+        with _open_sequence_file(path) as handle:
+            return _records_columns(SeqIO.parse(handle, format), feature_types)
+    with open(path, "rb") as handle:
+        handle.seek(start)
+        chunk = io.TextIOWrapper(io.BytesIO(handle.read(end - start)))
+    return _records_columns(SeqIO.parse(chunk, format), feature_types)
+
+
+def _record_chunks(path, format, chunk_size):
+    # byte ranges of whole records of at least chunk_size bytes, found by streaming the file for record starts
+    marker = _RECORD_STARTS.get(format)
+    if marker is None or path.endswith(".gz"):
+        yield None, None
+        return
+    start, offset = None, 0
+    with open(path, "rb") as handle:
+        for line in handle:
+            if line.startswith(marker):
+                if start is None:
+                    start = offset
+                elif offset - start >= chunk_size:
+                    yield start, offset
+                    start = offset
+            offset += len(line)
+    if start is not None:
+        yield start, offset
+
+
+def extract_features(sources, feature_types=["gene"], format="genbank", max_workers=None, chunk_size=1 << 22):
+    """
+    Extracts the records and features of many sequence files in a pool of processes. Files are split in chunks
+    of records while they are scanned, so the records of a single large file are also parsed in parallel.
+
+    Arguments
+    =========
+    sources :
+        list of files (optionally gzipped) and SeqRecords, records already in memory are extracted in this process
+        since sending them to a worker costs more than extracting them
+    feature_types :
+        the feature types to extract (e.g. gene, CDS, tRNA, rRNA)
+    format :
+        Biopython format of the files
+    max_workers :
+        maximum number of worker processes (defaults to the number of CPUs), 1 parses in this process
+    chunk_size :
+        approximate size in bytes of the chunks of records sent to the workers, gzipped files and formats other
+        than genbank and fasta are sent whole
+
+    Returns
+    =======
+    ExtractedFeatures
+        the records and features of all sources, in the order of the sources and of the records in each file
+    """
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    paths = [source for source in sources if not isinstance(source, SeqRecord)]
+    extract = partial(_file_columns, feature_types=feature_types, format=format)
+    if max_workers > 1 and len(paths) > 0:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = {path: [executor.submit(extract, path, start=start, end=end)
+                              for start, end in _record_chunks(path, format, chunk_size)] for path in paths}
+            parsed = {path: [future.result() for future in chunks] for path, chunks in futures.items()}
+    else:
+        parsed = {path: [extract(path)] for path in paths}
+
+    results = [result for source in sources
+               for result in (parsed[source] if not isinstance(source, SeqRecord) else
+                              [_records_columns([source], feature_types)])]
+    offsets = np.cumsum([0] + [len(result.ids) for result in results])
+    return _concat_columns(np.concatenate([result.ids for result in results] + [np.empty(0, dtype=str)]),
+                           np.concatenate([result.names for result in results] + [np.empty(0, dtype=str)]),
+                           np.concatenate([result.lengths for result in results] + [np.empty(0, dtype=np.int64)]),
+                           [(result.records + offset, result.types, result.starts, result.ends)
+                            for result, offset in zip(results, offsets)])
+
+
+def extracted_features_to_karyotype(features, color_map={}):
+    """
+    Karyotype with one chromosome per record of ExtractedFeatures.
+    """
+    return Karyotype.from_arrays(features.ids, features.names, np.ones(len(features.ids), dtype=np.int64),
+                                 features.lengths,
+                                 [color_map.get(identifier, DEFAUT_CHR_COLOR) for identifier in features.ids.tolist()])
+
+
+def extracted_features_to_tables(features, feature_types=["gene"], kind="tile"):
+    """
+    One table per feature type covering every record of ExtractedFeatures, as seq_records_to_feature_tables.
+    feature_types must be the types given to extract_features.
+    """
+    tables = {}
+    for code, feature_type in enumerate(feature_types):
+        mask = features.types == code
+        table = _features_table("", features.starts[mask], features.ends[mask], kind)
+        table["chromosome"] = features.ids[features.records[mask]].astype(object)
+        tables[feature_type] = table
+    return tables
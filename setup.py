@@ -16,11 +16,14 @@ from setuptools import setup, find_packages
 setup(
     name='pyrcos',
     version="0.0.1",
-    packages=find_packages("."),
+    packages=find_packages(".", exclude=["benchmarks", "benchmarks.*", "tests", "tests.*"]),
     install_requires=[
         "biopython>=1.65",
         "jinja2>=2",
     ],
+    extras_require={
+        "animation": ["Pillow"],
+    },
     author='Joao Cardoso',
     author_email='jooaaoo@gmail.com',
     description='Python hi-level interface for circos',
@@ -0,0 +1,56 @@
+from unittest import TestCase
+import os
+import shutil
+import stat
+import sys
+import tempfile
+
+FAKE_CIRCOS = """import os
+import sys
+import time
+
+args = dict(zip(sys.argv[1:], sys.argv[2:]))
+with open(args["-config"]) as config:
+    configuration = config.read()
+
+if "progress" in configuration:
+    for step in range(3):
+        print("step %i" % step, flush=True)
+if "sleep" in configuration:
+    with open(args["-dir"] + "/sleeping", "w") as sleeping:
+        sleeping.write("%i %s" % (os.getpid(), args["-config"]))
+    time.sleep(10)
+if "fail" in configuration:
+    sys.stderr.write("cannot render\\n")
+    sys.exit(1)
+
+format = "svg" if "-svg" in sys.argv else "png"
+name = args["-file"].rsplit(".", 1)[0] if args["-file"].endswith((".png", ".svg")) else args["-file"]
+with open("%s/%s.%s" % (args["-dir"], name, format), "w") as output:
+    output.write(configuration)
+with open(args["-dir"] + "/runs.log", "a") as log:
+    log.write(name + "\\n")
+print("done")
+"""
+
+
+class Configuration(object):
+    def __init__(self, text):
+        self.text = text
+
+    def __str__(self):
+        return self.text
+
+
+class FakeCircosTestCase(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.directory, "bin"))
+        executable = os.path.join(self.directory, "bin", "circos")
+        with open(executable, "w") as fw:
+            fw.write("#!%s\n" % sys.executable + FAKE_CIRCOS)
+        os.chmod(executable, os.stat(executable).st_mode | stat.S_IEXEC)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
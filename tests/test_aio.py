@@ -0,0 +1,80 @@
+from fake_circos import Configuration, FakeCircosTestCase
+from pyrcos.aio import circos_async, circos_lines
+from pyrcos.cache import RenderCache
+from pyrcos.tracks import TrackStore
+import asyncio
+import os
+import threading
+
+
+class AsyncTestCase(FakeCircosTestCase):
+
+    def test_circos_async(self):
+        output = os.path.join(self.directory, "figure.png")
+        lines = []
+        result = asyncio.run(circos_async(Configuration("progress"), output, circos_path=self.directory,
+                                          progress=lines.append))
+        self.assertTrue(result.ok)
+        self.assertEqual(lines, ["step 0", "step 1", "step 2", "done"])
+        self.assertTrue(os.path.isfile(output))
+
+    def test_blocking_work_off_the_loop(self):
+        threads = []
+
+        class Recording(Configuration):
+            def __str__(self):
+                threads.append(threading.current_thread())
+                return self.text
+
+        output = os.path.join(self.directory, "figure.png")
+        cache = RenderCache(os.path.join(self.directory, "cache"))
+        self.assertTrue(asyncio.run(circos_async(Recording("done"), output, circos_path=self.directory,
+                                                 cache=cache)).ok)
+        self.assertTrue(asyncio.run(circos_async(Recording("done"), output, circos_path=self.directory,
+                                                 cache=cache)).cached)
+        self.assertEqual(len(threads), 2)
+        self.assertNotIn(threading.main_thread(), threads)
+
+    def test_executor_keeps_the_active_store(self):
+        stores = []
+
+        class Recording(Configuration):
+            def __str__(self):
+                stores.append(TrackStore.current())
+                return self.text
+
+        with TrackStore() as store:
+            output = os.path.join(self.directory, "figure.png")
+            self.assertTrue(asyncio.run(circos_async(Recording("done"), output, circos_path=self.directory)).ok)
+        self.assertEqual(stores, [store])
+        store.close()
+
+    def test_circos_lines(self):
+        async def collect():
+            return [line async for line in circos_lines(Configuration("progress"), output, self.directory)]
+
+        output = os.path.join(self.directory, "figure.png")
+        self.assertEqual(asyncio.run(collect()), ["step 0", "step 1", "step 2", "done"])
+
+    def test_failure(self):
+        output = os.path.join(self.directory, "figure.png")
+        with self.assertRaises(RuntimeError):
+            asyncio.run(circos_async(Configuration("fail"), output, circos_path=self.directory))
+
+    def test_cancel(self):
+        sleeping = os.path.join(self.directory, "sleeping")
+
+        async def cancel():
+            task = asyncio.ensure_future(circos_async(Configuration("sleep"), os.path.join(self.directory, "f.png"),
+                                                      circos_path=self.directory))
+            while not os.path.exists(sleeping) or os.path.getsize(sleeping) == 0:
+                await asyncio.sleep(0.05)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+        asyncio.run(cancel())
+        with open(sleeping) as fr:
+            pid, config = fr.read().split()
+        self.assertFalse(os.path.exists(config))
+        self.assertRaises(OSError, os.kill, int(pid), 0)
@@ -0,0 +1,97 @@
+from unittest import TestCase
+from pandas import DataFrame
+from pyrcos.binning import bin_envelope, bin_size, bin_track, bundle_links
+from pyrcos.objects import Circos, Histogram, Karyotype, KaryotypeChromosome, Line, Link, Tile
+from pyrcos.tracks import TrackStore, read_track
+import numpy as np
+
+
+class BinningTestCase(TestCase):
+
+    def setUp(self):
+        positions = np.arange(0, 1000)
+        self.track = DataFrame(dict(chromosome=np.where(positions < 600, "chr1", "chr2"),
+                                    start=np.where(positions < 600, positions, positions - 600),
+                                    end=np.where(positions < 600, positions, positions - 600) + 1,
+                                    value=positions.astype(float)))
+        self.karyotype = Karyotype([KaryotypeChromosome("chr1", "1", 0, 600, "blue"),
+                                    KaryotypeChromosome("chr2", "2", 0, 400, "red")])
+
+    def test_bin_size(self):
+        self.assertEqual(bin_size(self.karyotype, 100), 2)
+        self.assertEqual(bin_size(self.karyotype, 10000), 1)
+
+    def test_bin_track(self):
+        binned = bin_track(self.track, 100, how="mean")
+        self.assertEqual(list(binned["chromosome"]), ["chr1"] * 6 + ["chr2"] * 4)
+        self.assertEqual(list(binned["start"][0:2]), [0, 100])
+        self.assertEqual(list(binned["end"][0:2]), [99, 199])
+        self.assertEqual(binned["value"][0], 49.5)
+        self.assertEqual(bin_track(self.track, 100, how="sum")["value"][0], 4950)
+        self.assertEqual(bin_track(self.track, 100, how="max")["value"][6], 699)
+        self.assertRaises(ValueError, bin_track, self.track, 100, how="median")
+
+    def test_last_bin(self):
+        track = DataFrame(dict(chromosome=["chr1", "chr1", "chr1", "chr2"], start=[0, 70, 90, 0], end=[9, 79, 96, 200],
+                               value=[1.0, 2.0, 3.0, 4.0]))
+        binned = bin_track(track, 60)
+        self.assertEqual(list(binned["start"]), [0, 60, 0])
+        self.assertEqual(list(binned["end"]), [59, 96, 59])
+        self.assertEqual(list(binned["value"]), [1.0, 2.5, 4.0])
+        self.assertEqual(list(bin_envelope(track, 60)[1]["end"]), [59, 96, 59])
+
+    def test_bin_envelope(self):
+        lower, upper = bin_envelope(self.track, 500)
+        self.assertEqual(list(lower["value"]), [0, 500, 600])
+        self.assertEqual(list(upper["value"]), [499, 599, 999])
+
+    def test_circos_binning(self):
+        with TrackStore() as store:
+            histogram = Histogram(self.track, 0.5, 0.8)
+            tile = Tile(self.track, 0.3, 0.4)
+            Circos(self.karyotype, plots=[histogram, tile], width=200, binning="max")
+
+        self.assertLess(len(read_track(histogram.file)), len(self.track))
+        self.assertEqual(len(read_track(tile.file)), len(self.track))
+        self.assertRaises(ValueError, tile.downsample, self.karyotype, 100)
+        store.close()
+
+    def test_plot_envelope(self):
+        with TrackStore() as store:
+            line = Line(self.track, 0.5, 0.8, color="red")
+            lower, upper = line.envelope(self.karyotype, 100, size=500)
+            self.assertEqual(list(read_track(lower.file)["value"]), [0, 500, 600])
+            self.assertEqual(list(read_track(upper.file)["value"]), [499, 599, 999])
+            self.assertEqual(len(read_track(line.file)), len(self.track))
+            self.assertEqual((lower.r0, upper.r1, upper.color), (0.5, 0.8, "red"))
+            self.assertRaises(ValueError, Tile(self.track, 0.3, 0.4).envelope, self.karyotype, 100)
+        store.close()
+
+    def test_bundle_links(self):
+        links = DataFrame([["chr1", 100, 110, "chr2", 500, 510, "color=red"],
+                           ["chr1", 115, 120, "chr2", 505, 530, "color=blue"],
+                           ["chr1", 118, 125, "chr2", 900, 910, "color=red"],
+                           ["chr1", 400, 410, "chr2", 500, 510, "color=red"],
+                           ["chr1", 105, 110, "chr1", 500, 510, "color=red"]])
+        bundles = bundle_links(links, 10)
+        self.assertEqual(len(bundles), 4)
+        bundle = bundles[bundles["chromosome2"] == "chr2"].iloc[0]
+        self.assertEqual(list(bundle)[1:], [100, 120, "chr2", 500, 530, "color=red,nlinks=2"])
+        self.assertEqual(len(bundle_links(links, 10, min_links=2)), 1)
+        self.assertEqual(len(bundle_links(links.iloc[:, 0:6], 1000)), 2)
+        self.assertEqual(list(bundle_links(links.iloc[:, 0:6], 1000)["options"]), ["nlinks=1", "nlinks=4"])
+
+    def test_link_bundle(self):
+        random = np.random.RandomState(0)
+        starts = random.randint(0, 1000, 200) * 10
+        links = DataFrame(dict(chromosome1="chr1", start1=starts, end1=starts + 5, chromosome2="chr2",
+                               start2=starts // 2, end2=starts // 2 + 5))
+        with TrackStore() as store:
+            link = Link(links)
+            collapsed = link.bundle(100)
+            bundles = read_track(link.file)
+        self.assertEqual(collapsed, len(links) - len(bundles))
+        self.assertGreater(collapsed, 0)
+        self.assertTrue(link.ribbon)
+        self.assertEqual(bundles["options"].str.slice(7).astype(int).sum(), len(links))
+        store.close()
@@ -0,0 +1,87 @@
+from fake_circos import Configuration, FakeCircosTestCase
+from pyrcos.cache import RenderCache, configuration_key
+from pyrcos.cmd import circos, render, render_many
+import contextlib
+import os
+import threading
+
+
+class CmdTestCase(FakeCircosTestCase):
+
+    def test_render(self):
+        output = os.path.join(self.directory, "figure.png")
+        result = render(Configuration("karyotype = k.txt"), output, circos_path=self.directory)
+        self.assertTrue(result.ok)
+        self.assertEqual(result.stdout.strip(), "done")
+        with open(output) as fr:
+            self.assertEqual(fr.read(), "karyotype = k.txt")
+
+    def test_render_many(self):
+        jobs = [(Configuration("figure %i" % i), os.path.join(self.directory, "figure%i.png" % i)) for i in range(6)]
+        jobs.append((Configuration("fail"), os.path.join(self.directory, "failed.png")))
+        jobs.append((Configuration("sleep"), os.path.join(self.directory, "slow.png")))
+        results = render_many(jobs, circos_path=self.directory, max_workers=4, timeout=2)
+
+        self.assertEqual([r.output_file for r in results], [output for _, output in jobs])
+        self.assertTrue(all(r.ok for r in results[:6]))
+        self.assertEqual(results[6].returncode, 1)
+        self.assertIn("cannot render", results[6].stderr)
+        self.assertTrue(results[7].timed_out)
+        self.assertFalse(results[7].ok)
+
+
+    def test_render_many_prepares_in_workers(self):
+        events = []
+
+        class Figure(Configuration):
+            @contextlib.contextmanager
+            def workspace(self):
+                events.append(("enter", self.text))
+                yield
+                events.append(("exit", self.text))
+
+            def __str__(self):
+                events.append(("render", self.text, threading.current_thread() is threading.main_thread()))
+                return self.text
+
+        jobs = [(Figure("figure %i" % i), os.path.join(self.directory, "figure%i.png" % i)) for i in range(2)]
+        self.assertTrue(all(r.ok for r in render_many(jobs, circos_path=self.directory, max_workers=1)))
+        self.assertEqual(events, [("enter", "figure 0"), ("render", "figure 0", False), ("exit", "figure 0"),
+                                  ("enter", "figure 1"), ("render", "figure 1", False), ("exit", "figure 1")])
+
+
+class RenderCacheTestCase(FakeCircosTestCase):
+
+    def _runs(self):
+        with open(os.path.join(self.directory, "runs.log")) as fr:
+            return fr.read().split()
+
+    def test_configuration_key(self):
+        data = [os.path.join(self.directory, "data%i.txt" % i) for i in range(3)]
+        for path, content in zip(data, ["chr1 1 10 1", "chr1 1 10 1", "chr1 1 10 2"]):
+            with open(path, "w") as fw:
+                fw.write(content)
+
+        self.assertEqual(configuration_key("file = %s" % data[0]), configuration_key("file = %s" % data[1]))
+        self.assertNotEqual(configuration_key("file = %s" % data[0]), configuration_key("file = %s" % data[2]))
+
+    def test_cached_render(self):
+        cache = RenderCache(os.path.join(self.directory, "cache"))
+        first = os.path.join(self.directory, "first.svg")
+        second = os.path.join(self.directory, "second.svg")
+        circos(Configuration("figure"), first, circos_path=self.directory, format="svg", cache=cache)
+        result = render(Configuration("figure"), second, circos_path=self.directory, format="svg", cache=cache)
+
+        self.assertTrue(result.cached)
+        self.assertEqual(self._runs(), ["first"])
+        with open(second) as fr:
+            self.assertEqual(fr.read(), "figure")
+
+    def test_eviction(self):
+        cache = RenderCache(os.path.join(self.directory, "cache"), max_size=len("figure 0") * 2)
+        jobs = [(Configuration("figure %i" % i), os.path.join(self.directory, "figure%i.png" % i)) for i in range(4)]
+        for job in jobs:
+            render(job[0], job[1], circos_path=self.directory, cache=cache)
+
+        self.assertEqual(len(os.listdir(cache.directory)), 2)
+        self.assertTrue(render(jobs[-1][0], jobs[-1][1], circos_path=self.directory, cache=cache).cached)
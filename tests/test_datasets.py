@@ -0,0 +1,228 @@
+from unittest import TestCase
+from math import log
+from pyrcos.datasets.cache import DatasetCache
+from pyrcos.datasets.protein_abundance import convert_abundance_to_file, convert_abundance_to_tables, read_paxdb, \
+    read_paxdb_table
+from pyrcos.datasets.regulatory_network import RegulatoryNetwork, convert_interactions_to_links, parse_regulondb
+from pyrcos.datasets.tn_seq import convert_sample_to_table, load_essentials, parse_essentials, read_essentials
+import numpy as np
+import os
+import shutil
+import tempfile
+
+ESSENTIALS = """Position\tS1\tS2\tS3
+10\t1\t2\t5
+10\t3\t0\t1
+20\t100\t0\t0
+30\t4\t4\t4
+"""
+
+
+class DatasetsTestCase(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _write(self, name, content):
+        path = os.path.join(self.directory, name)
+        with open(path, "w") as fw:
+            fw.write(content)
+        return path
+
+
+class TnSeqTestCase(DatasetsTestCase):
+
+    def test_load_essentials(self):
+        path = self._write("essentials.tsv", ESSENTIALS)
+        samples = load_essentials(path, ["S1", "S2"], chunksize=2)
+        self.assertEqual(list(samples.keys()), ["S1", "S2"])
+        self.assertEqual(list(samples["S1"].index), [10, 30])
+        self.assertEqual(list(samples["S1"]["insertions"]), [4, 4])
+        self.assertEqual(list(samples["S2"]["insertions"]), [2, 4])
+
+        table = convert_sample_to_table(samples["S2"], "chr1")
+        self.assertEqual(list(table["end"]), [11, 31])
+
+        self.assertEqual(read_essentials(path, ("S1", "S2")).dtypes.tolist(), [np.int64, np.int64])
+        self.assertEqual(read_essentials(path, ("S1",), normalization=log)["S1"].dtype, np.float64)
+
+    def test_parse_essentials_normalization(self):
+        path = self._write("essentials.tsv", ESSENTIALS)
+        scalar = list(parse_essentials(path, ["S1"], normalization=log))[0]
+        vectorized = list(parse_essentials(path, ["S1"], normalization=np.log))[0]
+        self.assertEqual(list(scalar["insertions"]), list(vectorized["insertions"]))
+        self.assertAlmostEqual(scalar["insertions"][10], log(4))
+
+        branching = list(parse_essentials(path, ["S1"], normalization=lambda x: 0 if x == 0 else log(x)))[0]
+        self.assertEqual(list(branching["insertions"]), list(scalar["insertions"]))
+
+
+GENES = """# RegulonDB genes
+G1\tcrp\tb3357\t100\t200\t
+G2\tlacZ\tb0344\t300\t400\t
+G3\tlacI\tb0345\t500\t600\t
+G4\tnoLocus\t\t700\t800\t
+"""
+
+TRANSCRIPTION_FACTORS = """# RegulonDB TFs
+T1\tCRP\tcrp
+T2\tLacI\tlacI
+"""
+
+INTERACTIONS = """# RegulonDB interactions
+CRP\tlacZ\t+\tevidence
+LacI\tlacZ\t-\tevidence
+LacI\tlacI\t+-\tevidence
+Unknown\tlacZ\t+\tevidence
+CRP\tnoLocus\t+\tevidence
+"""
+
+
+class RegulatoryNetworkTestCase(DatasetsTestCase):
+
+    def setUp(self):
+        super(RegulatoryNetworkTestCase, self).setUp()
+        self.sources = [self._write("genes.txt", GENES), self._write("tfs.txt", TRANSCRIPTION_FACTORS),
+                        self._write("network.txt", INTERACTIONS)]
+        self.positions = {"b3357": (100, 200, "chr1"), "b0344": (300, 400, "chr1"), "b0345": (500, 600, "chr2")}
+
+    def test_parse_regulondb(self):
+        interactions = parse_regulondb(*self.sources)
+        self.assertEqual([(tf.name, gene.locus, regulation) for tf, gene, regulation in interactions],
+                         [("crp", "b0344", "+"), ("lacI", "b0344", "-"), ("lacI", "b0345", "+-")])
+
+    def test_links(self):
+        network = RegulatoryNetwork.parse(*self.sources)
+        links = convert_interactions_to_links(network, self.positions)
+        expected = convert_interactions_to_links(list(network.interactions), self.positions)
+        with open(links.name) as fr, open(expected.name) as expected_fr:
+            self.assertEqual(fr.read(), expected_fr.read())
+
+    def test_interactions(self):
+        interactions = RegulatoryNetwork.parse(*self.sources).interactions
+        self.assertEqual(len(interactions), 3)
+        tf, gene, regulation = interactions[2]
+        self.assertEqual((tf.name, gene.locus, gene.start, regulation), ("lacI", "b0345", 500, "+-"))
+        self.assertEqual([gene.locus for _, gene, _ in interactions[0:2]], ["b0344", "b0344"])
+        rows = list(interactions)
+        self.assertIs(rows[0][1], rows[1][1])
+        self.assertFalse(hasattr(gene, "__dict__"))
+
+    def test_cache(self):
+        cache_file = os.path.join(self.directory, "cache", "network.npz")
+        network = RegulatoryNetwork.load(*self.sources, cache_file=cache_file)
+        self.assertTrue(os.path.isfile(cache_file))
+        cached = RegulatoryNetwork.load(*self.sources, cache_file=cache_file)
+        self.assertEqual(list(cached.targets), list(network.targets))
+        self.assertEqual(list(cached.loci), list(network.loci))
+
+        self._write("network.txt", INTERACTIONS + "CRP\tlacI\t-\tevidence\n")
+        self.assertEqual(len(RegulatoryNetwork.load(*self.sources, cache_file=cache_file)), 4)
+
+
+PAXDB = """#name: H.sapiens - Whole organism
+#score: 1.0
+1\t4932.YAL001C\t10.0
+2\t4932.YAL002W\t100.0
+3\t4932.YAL003W\t1000.0
+"""
+
+
+class ProteinAbundanceTestCase(DatasetsTestCase):
+
+    def setUp(self):
+        super(ProteinAbundanceTestCase, self).setUp()
+        self.positions = {"YAL001C": (1, 100, "chrI"), "YAL003W": (200, 300, "chrI")}
+
+    def test_read_paxdb(self):
+        path = self._write("paxdb.txt", PAXDB)
+        abundance = read_paxdb(path)
+        self.assertEqual(sorted(abundance.keys()), ["YAL001C", "YAL002W", "YAL003W"])
+        self.assertAlmostEqual(abundance["YAL002W"], log(100))
+
+    def test_convert_abundance(self):
+        datasets = {"whole": self._write("paxdb.txt", PAXDB), "raw": self._write("raw.txt", PAXDB)}
+        table = read_paxdb_table(datasets, normalization=None)
+        self.assertEqual(len(table), 6)
+
+        tables = convert_abundance_to_tables(table, self.positions)
+        self.assertEqual(list(tables["raw"]["value"]), [10.0, 1000.0])
+        self.assertEqual(list(tables["raw"]["chromosome"]), ["chrI", "chrI"])
+
+        file = convert_abundance_to_file(read_paxdb(datasets["raw"], normalization=float), self.positions)
+        with open(file.name) as fr:
+            self.assertEqual(fr.read(), "chrI 1 100 10.000000\nchrI 200 300 1000.000000\n")
+
+
+class DatasetCacheTestCase(DatasetsTestCase):
+
+    def setUp(self):
+        super(DatasetCacheTestCase, self).setUp()
+        self.cache = DatasetCache(os.path.join(self.directory, "cache"))
+        self.calls = []
+
+    def _counted(self, function):
+        def counted(*args, **kwargs):
+            self.calls.append(args)
+            return function(*args, **kwargs)
+        counted.__qualname__ = function.__qualname__
+        counted.__module__ = function.__module__
+        return counted
+
+    def test_table(self):
+        datasets = {"whole": self._write("paxdb.txt", PAXDB), "raw": self._write("raw.txt", PAXDB)}
+        read = self._counted(read_paxdb_table)
+        table = self.cache.cached(read, datasets, normalization=None)
+        cached = self.cache.cached(read, datasets, normalization=None)
+        self.assertEqual(len(self.calls), 1)
+        self.assertIsInstance(cached["abundance"].values, np.memmap)
+        self.assertEqual(cached.values.tolist(), read_paxdb_table(datasets, normalization=None).values.tolist())
+        self.assertEqual(table.values.tolist(), cached.values.tolist())
+
+        self.cache.cached(read, datasets, normalization=np.log)
+        self.cache.cached(read, {"whole": datasets["whole"]}, normalization=None)
+        self.assertEqual(len(self.calls), 3)
+
+        self._write("raw.txt", PAXDB + "4\t4932.YAL004W\t5.0\n")
+        self.assertEqual(len(self.cache.cached(read, datasets, normalization=None)), 7)
+        self.assertEqual(len(self.calls), 4)
+
+    def test_function_keys(self):
+        def scaled(factor):
+            return lambda x: x * factor
+
+        path = self._write("essentials.tsv", ESSENTIALS)
+        keys = [self.cache.key(load_essentials, [path], normalization=normalization)
+                for normalization in (lambda x: np.log2(x), lambda x: np.log10(x), scaled(2), scaled(3), np.log)]
+        self.assertEqual(len(set(keys)), len(keys))
+        self.assertEqual(self.cache.key(load_essentials, [path], lambda x: np.log2(x)),
+                         self.cache.key(load_essentials, [path], lambda x: np.log2(x)))
+
+        class Normalization(object):
+            pass
+
+        self.assertRaises(TypeError, self.cache.key, load_essentials, [path], Normalization)
+
+    def test_tables(self):
+        path = self._write("essentials.tsv", ESSENTIALS)
+        samples = self.cache.cached(load_essentials, path, ["S1", "S2"])
+        cached = self.cache.cached(load_essentials, path, ["S1", "S2"])
+        self.assertEqual(list(cached.keys()), ["S1", "S2"])
+        self.assertEqual(list(cached["S1"].index), [10, 30])
+        self.assertEqual(list(cached["S2"]["insertions"]), list(samples["S2"]["insertions"]))
+
+    def test_eviction(self):
+        for i in range(3):
+            self.cache.store("entry%i" % i, {"values": np.arange(1000)})
+            os.utime(os.path.join(self.cache.path("entry%i" % i), "meta.json"), (i, i))
+        self.assertEqual(list(self.cache.fetch("entry0")["values"][0:3]), [0, 1, 2])
+        self.cache.max_size = self.cache.size() - 1
+        self.cache.evict()
+        self.assertIsNone(self.cache.fetch("entry1"))
+        self.assertIsNotNone(self.cache.fetch("entry0"))
+        self.assertRaises(TypeError, self.cache.store, "entry", [1, 2, 3])
+        self.cache.clear()
+        self.assertEqual(self.cache.size(), 0)
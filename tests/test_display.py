@@ -0,0 +1,54 @@
+from unittest import mock
+from IPython.display import FileLink
+from fake_circos import FakeCircosTestCase
+from pyrcos.objects import Circos, Karyotype, KaryotypeChromosome
+import os
+
+
+class DisplayTestCase(FakeCircosTestCase):
+
+    def _runs(self):
+        with open(os.path.join(self.circos.__dict__["_display"]["directory"], "runs.log")) as fr:
+            return fr.read().split()
+
+    def test_display(self):
+        self.circos = Circos(Karyotype([KaryotypeChromosome("chr1", "1", 0, 100, "blue")]),
+                             circos_path=self.directory)
+        html = self.circos._repr_html_()
+        self.assertTrue(html.startswith('<img src="data:image/png;base64,'))
+        self.assertEqual(self.circos._repr_html_(), html)
+        self.assertEqual(len(self._runs()), 1)
+
+        self.circos.radius = 500
+        self.circos._repr_html_()
+        self.assertEqual(len(self._runs()), 2)
+
+        svg = self.circos._display_render("svg")
+        with open(svg) as fr:
+            self.assertIn("radius* = 500p", fr.read())
+        self.circos._display_render("svg")
+        self.assertEqual(len(self._runs()), 3)
+
+    def test_display_hit_writes_no_files(self):
+        self.circos = Circos(Karyotype([KaryotypeChromosome("chr1", "1", 0, 100, "blue")]),
+                             circos_path=self.directory)
+        self.circos._repr_html_()
+        with mock.patch.object(Circos, "workspace", autospec=True, side_effect=Circos.workspace) as workspace:
+            self.circos._repr_html_()
+            self.assertEqual(workspace.call_count, 0)
+            self.circos.radius = 600
+            self.circos._repr_html_()
+            self.assertEqual(workspace.call_count, 1)
+        self.assertEqual(len(self._runs()), 2)
+
+    def test_display_large_svg(self):
+        self.circos = Circos(Karyotype([KaryotypeChromosome("chr1", "1", 0, 100, "blue")]),
+                             circos_path=self.directory)
+        path = os.path.join(self.directory, "figure.svg")
+        with mock.patch("pyrcos.objects.display") as display:
+            self.circos.display_svg(inline_limit=0, file_path=path)
+        link = display.call_args[0][0]
+        self.assertIsInstance(link, FileLink)
+        self.assertEqual(link.path, path)
+        with open(path) as fr:
+            self.assertIn("karyotype", fr.read())
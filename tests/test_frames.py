@@ -0,0 +1,70 @@
+from unittest import mock
+from fake_circos import FakeCircosTestCase
+from pandas import DataFrame
+from pyrcos import frames
+from pyrcos.frames import FrameSeries
+from pyrcos.objects import Circos, Histogram, Karyotype, KaryotypeChromosome
+from pyrcos.tracks import TrackStore
+import os
+import stat
+import sys
+
+
+class FrameSeriesTestCase(FakeCircosTestCase):
+
+    def test_frames(self):
+        karyotype = Karyotype([KaryotypeChromosome("chr1", "1", 0, 100, "blue")])
+        samples = [DataFrame(dict(chromosome="chr1", start=[0, 50], end=[49, 99], value=[i, 2 * i]))
+                   for i in range(3)]
+        with TrackStore() as store:
+            varying = Histogram(samples[0], 0.5, 0.6)
+            fixed = Histogram(samples[2], 0.7, 0.8)
+            circos = Circos(karyotype, plots=[varying, fixed], circos_path=self.directory)
+            series = FrameSeries(circos, [{varying: sample} for sample in samples])
+            pattern = os.path.join(self.directory, "frame%02i")
+            results = series.render(pattern, max_workers=2)
+
+            self.assertTrue(all(result.ok for result in results))
+            self.assertEqual(series.outputs, [pattern % i + ".png" for i in range(3)])
+            configurations = []
+            for output in series.outputs:
+                with open(output) as fr:
+                    configurations.append(fr.read())
+            self.assertEqual(configurations[0], circos.configuration)
+            self.assertNotEqual(configurations[1], configurations[0])
+            self.assertIn(fixed.file.name, configurations[1])
+            self.assertIn(karyotype.filename, configurations[1])
+            # the samples of the base figure and the karyotype, the other frames are gone
+            self.assertEqual(len(store), 3)
+            self.assertIs(series.figure(1).plots[1], fixed)
+        store.close()
+
+    def test_animate(self):
+        fake = os.path.join(self.directory, "bin", "magick")
+        with open(fake, "w") as fw:
+            fw.write("#!%s\nimport sys\nopen(sys.argv[-1], 'w').write(' '.join(sys.argv[1:-1]))\n" % sys.executable)
+        os.chmod(fake, os.stat(fake).st_mode | stat.S_IEXEC)
+        path = os.environ["PATH"]
+        os.environ["PATH"] = os.path.join(self.directory, "bin") + os.pathsep + path
+        try:
+            with mock.patch.object(frames, "Image", None):
+                output = frames.animate(["a.png", "b.png"], os.path.join(self.directory, "out.gif"), delay=0.5)
+        finally:
+            os.environ["PATH"] = path
+        with open(output) as fr:
+            self.assertEqual(fr.read(), "-delay 50 -loop 0 a.png b.png")
+
+        series = FrameSeries(None, [])
+        self.assertRaises(RuntimeError, series.animate, "out.gif")
+        self.assertRaises(ValueError, frames.animate, [], "out.gif")
+
+    def test_animate_pillow(self):
+        images = [mock.Mock(), mock.Mock(), mock.Mock()]
+        with mock.patch.object(frames, "Image") as image:
+            image.open.side_effect = images
+            self.assertEqual(frames.animate(["a.png", "b.png", "c.png"], "out.gif", delay=0.25, loop=2), "out.gif")
+
+        self.assertEqual([c[0][0] for c in image.open.call_args_list], ["a.png", "b.png", "c.png"])
+        images[0].save.assert_called_once_with("out.gif", save_all=True, append_images=images[1:], duration=250,
+                                               loop=2)
+        self.assertTrue(all(i.close.called for i in images))
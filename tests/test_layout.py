@@ -0,0 +1,71 @@
+from unittest import TestCase
+from Bio.Seq import Seq
+from Bio.SeqFeature import SeqFeature, FeatureLocation
+from Bio.SeqRecord import SeqRecord
+from pandas import DataFrame
+from pyrcos.layout import pack_layers
+from pyrcos.objects import Tile
+from pyrcos.tracks import TrackStore, read_track
+from pyrcos.utils import seq_record_to_tiles
+import numpy as np
+
+
+class LayoutTestCase(TestCase):
+
+    def setUp(self):
+        self.tiles = DataFrame([["chr1", 0, 100], ["chr1", 50, 150], ["chr1", 120, 200], ["chr1", 60, 70],
+                                ["chr2", 0, 100], ["chr1", 210, 300]])
+
+    def test_pack_layers(self):
+        self.assertEqual(list(pack_layers(self.tiles)), [0, 1, 0, 2, 0, 0])
+        self.assertEqual(list(pack_layers(self.tiles, margin=20)), [0, 1, 2, 2, 0, 0])
+
+    def test_pack_layers_overlap(self):
+        random = np.random.RandomState(0)
+        starts = random.randint(0, 10000, 300)
+        tiles = DataFrame(dict(chromosome="chr1", start=starts, end=starts + random.randint(1, 500, 300)))
+        layers = pack_layers(tiles)
+        for layer in np.unique(layers):
+            placed = tiles[layers == layer].sort_values("start")
+            self.assertTrue((placed["start"].values[1:] > placed["end"].values[:-1]).all())
+        depth = max(((tiles["start"] <= position) & (tiles["end"] >= position)).sum() for position in range(10500))
+        self.assertEqual(layers.max() + 1, depth)
+
+    def test_tile_pack(self):
+        with TrackStore() as store:
+            tile = Tile(self.tiles, 0.5, 0.6, layers=2)
+            self.assertEqual(tile.pack(margin=0), 1)
+            self.assertEqual(list(read_track(tile.file)["options"]), ["layer=0", "layer=1", "layer=0", "layer=0",
+                                                                      "layer=0"])
+            tile = Tile(self.tiles, 0.5, 0.6, layers=2, layers_overflow="collapse")
+            self.assertEqual(tile.pack(margin="0b"), 1)
+            self.assertEqual(list(read_track(tile.file)["options"])[3], "layer=0")
+            tile = Tile(self.tiles, 0.5, 0.6, layers=2, layers_overflow="grow")
+            self.assertEqual(tile.pack(margin=0), 1)
+            self.assertEqual(list(read_track(tile.file)["options"])[3], "layer=2")
+        store.close()
+
+    def test_tile_pack_margin(self):
+        with TrackStore() as store:
+            tile = Tile(self.tiles, 0.5, 0.6, margin="2u", layers_overflow="grow")
+            self.assertRaises(ValueError, tile.pack)
+            self.assertEqual(tile.pack(chromosomes_units=10), 0)
+            # 120-200 is within 20 bases of 0-100, it reuses the layer of 60-70 instead
+            self.assertEqual(list(read_track(tile.file)["options"]), ["layer=0", "layer=1", "layer=2", "layer=2",
+                                                                      "layer=0", "layer=0"])
+            self.assertRaises(ValueError, Tile(self.tiles, 0.5, 0.6, margin="5p").pack, 10)
+        store.close()
+
+    def test_tile_pack_feature_tiles(self):
+        features = [SeqFeature(FeatureLocation(0, 10), type="gene"), SeqFeature(FeatureLocation(5, 20), type="gene"),
+                    SeqFeature(FeatureLocation(30, 40), type="gene")]
+        tiles = next(seq_record_to_tiles([SeqRecord(Seq("A" * 50), id="chr1", features=features)]))
+        tiles.loc[2, "options"] = "color=red,layer=5"
+        with TrackStore() as store:
+            tile = Tile(tiles, 0.5, 0.6)
+            self.assertEqual(tile.pack(chromosomes_units=1), 0)
+            data = read_track(tile.file)
+            self.assertEqual(list(data.columns), ["chromosome", "start", "end", "value", "options"])
+            self.assertEqual(list(data["value"]), [1, 1, 1])
+            self.assertEqual(list(data["options"]), ["layer=0", "layer=1", "color=red,layer=0"])
+        store.close()
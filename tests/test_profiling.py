@@ -0,0 +1,43 @@
+from unittest import TestCase
+from pandas import DataFrame
+from pyrcos.objects import Circos, Histogram, Karyotype, KaryotypeChromosome, Rule
+from pyrcos.profiling import Profiler, phase
+from pyrcos.tracks import TrackStore
+
+
+class ProfilingTestCase(TestCase):
+
+    def test_disabled(self):
+        self.assertIs(phase("render"), phase("track"))
+        labels = []
+        phase("render", labels.append, "label")
+        self.assertEqual(labels, [])
+        with Profiler() as profiler:
+            with phase("render", str.upper, "label"):
+                pass
+        self.assertEqual(profiler.records[0].name, "LABEL")
+
+    def test_profiler(self):
+        track = DataFrame(dict(chromosome=["chr1"] * 100, start=range(100), end=range(1, 101), value=[1.0] * 100))
+        records = []
+        with Profiler(memory=True, hooks=[records.append]) as profiler:
+            with TrackStore() as store:
+                plots = [Histogram(track, 0.5, 0.6, rules=[Rule(condition="var(value) > 0", color="red")]),
+                         Histogram(track.iloc[0:10], 0.6, 0.7)]
+            circos = Circos(Karyotype([KaryotypeChromosome("chr1", "1", 0, 100, "blue")]), plots=plots)
+            with circos.workspace():
+                circos.configuration
+
+        self.assertEqual(records, profiler.records)
+        summary = profiler.summary()
+        self.assertEqual(summary["track"][3], 2)
+        self.assertEqual(summary["karyotype"][3], 1)
+        self.assertGreater(summary["track"][2], 0)
+        self.assertGreater(summary["render"][1], 0)
+
+        circos_record = [r for r in profiler.records if r.name == "Circos"][0]
+        self.assertEqual(circos_record.depth, 0)
+        self.assertLess(circos_record.self_seconds, circos_record.seconds)
+        self.assertEqual(len(profiler.slowest(2, phase="track")), 2)
+        self.assertIn("slowest", profiler.report())
+        store.close()
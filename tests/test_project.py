@@ -0,0 +1,41 @@
+from fake_circos import Configuration, FakeCircosTestCase
+from pyrcos.project import Project
+import os
+
+
+class ProjectTestCase(FakeCircosTestCase):
+
+    def _write(self, name, content):
+        path = os.path.join(self.directory, name)
+        with open(path, "w") as fw:
+            fw.write(content)
+        return path
+
+    def test_incremental_build(self):
+        sources = [self._write("a.txt", "a"), self._write("b.txt", "b")]
+        built = []
+
+        def build(source, suffix=""):
+            built.append(source)
+            with open(source) as fr:
+                return Configuration(fr.read().strip() + suffix)
+
+        project = Project(self.directory, circos_path=self.directory, max_workers=2)
+        for i, source in enumerate(sources):
+            project.add("figure%i.png" % i, build, sources=[source], parameters=dict(source=source), format="png")
+
+        self.assertEqual([r.status for r in project.build()], ["rendered", "rendered"])
+        self.assertEqual([r.status for r in project.build()], ["up-to-date", "up-to-date"])
+        self.assertEqual(len(built), 2)
+
+        self._write("b.txt", "b\n")
+        self.assertEqual([r.status for r in project.build()], ["up-to-date", "unchanged"])
+        self._write("b.txt", "changed")
+        self.assertEqual([r.status for r in project.build()], ["up-to-date", "rendered"])
+        with open(os.path.join(self.directory, "figure1.png")) as fr:
+            self.assertEqual(fr.read(), "changed")
+
+        project.add("figure0.png", build, sources=[sources[0]], parameters=dict(source=sources[0], suffix="!"),
+                    format="png")
+        self.assertEqual([r.status for r in project.build()], ["rendered", "up-to-date"])
+        self.assertEqual(len(built), 5)
@@ -1,5 +1,9 @@
 from unittest import TestCase
-from pyrcos.objects import KaryotypeChromosome, KaryotypeBand, Ideogram
+from pandas import DataFrame
+import numpy as np
+import os
+from pyrcos.objects import KaryotypeChromosome, KaryotypeBand, Ideogram, Karyotype, Circos, Histogram, Tile, Rule, \
+    Tick, Axis
 
 expected_default_ideogram = \
 """<ideogram>
@@ -54,6 +58,41 @@ class PyrcosTestCase(TestCase):
         band = KaryotypeBand("id", "band.id", "band.label", 1, 10, "blue")
         self.assertEqual(str(band), "band id band.id band.label 1 10 blue")
 
+    def test_karyotype(self):
+        karyotype = Karyotype([KaryotypeChromosome("chr1", "1", 1, 100, "blue"),
+                               KaryotypeChromosome("chr2", "2", 1, 50, "red"),
+                               KaryotypeBand("chr1", "p1", "p1", 1, 40, "gpos25")])
+        text = "chr - chr1 1 1 100 blue\nchr - chr2 2 1 50 red\nband chr1 p1 p1 1 40 gpos25"
+        self.assertEqual(str(karyotype), text)
+        self.assertEqual(list(karyotype.stops), [100, 50, 40])
+        self.assertEqual(str(karyotype.rows[2]), "band chr1 p1 p1 1 40 gpos25")
+        self.assertEqual(str(karyotype[-1]), "band chr1 p1 p1 1 40 gpos25")
+        self.assertEqual([row.id for row in karyotype[0:2]], ["chr1", "chr2"])
+        self.assertEqual("\n".join(str(row) for row in karyotype), text)
+        self.assertFalse(hasattr(karyotype[0], "__dict__"))
+
+        parsed = Karyotype.parse("# comment\n" + text + "\n")
+        self.assertEqual(str(parsed), text)
+        self.assertEqual(list(parsed.chromosomes), [True, True, False])
+        self.assertRaises(ValueError, Karyotype.parse, "chr - c1 1 0 100 blue extra\nchr - c2 2 0 50")
+        self.assertEqual(list(Karyotype.parse("chr - c1 1 0 100 blue extra\nchr - c2 2 0 50 red").ids),
+                         ["c1", "c2"])
+
+    def test_karyotype_file(self):
+        karyotype = Karyotype([KaryotypeChromosome("chr1", "1", 1, 100, "blue")])
+        circos = Circos(karyotype)
+        filename = karyotype.filename
+        self.assertEqual(karyotype.filename, filename)
+        self.assertIn(filename, circos.configuration)
+        with circos.workspace():
+            with open(filename) as fr:
+                self.assertEqual(fr.read(), "chr - chr1 1 1 100 blue")
+        self.assertFalse(os.path.exists(filename))
+
+        karyotype.colors = np.array(["green"])
+        self.assertNotEqual(karyotype.filename, filename)
+        self.assertIn(karyotype.filename, circos.configuration)
+
     def test_ideogram(self):
         default_ideogram = Ideogram()
         default_attrs = dict(default_spacing=0, break_spacing=0, thickness=1, stroke_thickness=2, stroke_color="black",
@@ -64,4 +103,50 @@ class PyrcosTestCase(TestCase):
         for attr in default_attrs:
             self.assertEqual(getattr(default_ideogram, attr), default_attrs[attr])
 
-        self.assertEqual(str(default_ideogram), expected_default_ideogram)
\ No newline at end of file
+        self.assertEqual(str(default_ideogram), expected_default_ideogram)
+
+
+class ConfigurationCacheTestCase(TestCase):
+
+    def setUp(self):
+        track = DataFrame(dict(chromosome=["chr1"], start=[1], end=[10], value=[1.0]))
+        self.rule = Rule(condition="var(value) > 1", color="red")
+        self.histogram = Histogram(track, 0.5, 0.8, rules=[self.rule])
+        self.tile = Tile(track, 0.3, 0.4)
+        self.circos = Circos(Karyotype([KaryotypeChromosome("chr1", "chr1", 1, 100, "blue")]),
+                             plots=[self.histogram, self.tile])
+
+    def test_configuration_is_memoized(self):
+        configuration = self.circos.configuration
+        self.assertIs(self.circos.configuration, configuration)
+        self.assertIs(Histogram._template(), Histogram._template())
+
+    def test_changes_propagate_to_parents(self):
+        tile_configuration = self.tile.configuration
+        self.assertIn("color     = red", self.circos.configuration)
+
+        self.rule.color = "blue"
+        configuration = self.circos.configuration
+        self.assertIn("color     = blue", configuration)
+        self.assertNotIn("color     = red", configuration)
+        self.assertIs(self.tile.configuration, tile_configuration)
+
+        self.histogram.orientation = "in"
+        self.assertIn("orientation = in", self.circos.configuration)
+
+    def test_nested_changes_propagate(self):
+        tick = Tick(size="5p", spacing="1u", color="black")
+        axis = Axis(0, 1, color="grey")
+        histogram = Histogram(DataFrame(dict(chromosome=["chr1"], start=[1], end=[10], value=[1.0])), 0.5, 0.8,
+                              axes=[axis])
+        circos = Circos(Karyotype([KaryotypeChromosome("chr1", "chr1", 1, 100, "blue")]), plots=[histogram],
+                        ticks=[tick])
+        self.assertIn("color = grey", circos.configuration)
+
+        tick.color = "red"
+        self.assertIn("color          = red", circos.configuration)
+        axis.color = "green"
+        self.assertIn("color = green", histogram.configuration)
+        self.assertIn("color = green", circos.configuration)
+        circos.ticks.show_label = False
+        self.assertIn("show_tick_labels = False", circos.configuration)
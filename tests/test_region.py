@@ -0,0 +1,87 @@
+from unittest import TestCase
+from pandas import DataFrame
+from pyrcos.objects import Axis, Circos, Histogram, Karyotype, KaryotypeBand, KaryotypeChromosome, Link, Rule
+from pyrcos.region import IntervalIndex
+from pyrcos.tracks import TrackStore, read_track
+import numpy as np
+
+
+class IntervalIndexTestCase(TestCase):
+
+    def test_query(self):
+        index = IntervalIndex(["chr2", "chr1", "chr1", "chr1", "chr1"], [0, 50, 0, 10, 80], [10, 60, 100, 20, 90])
+        self.assertEqual(list(index.query("chr1", 55, 70)), [1, 2])
+        self.assertEqual(list(index.query("chr1", 21, 49)), [2])
+        self.assertEqual(list(index.query("chr2", 5, 5)), [0])
+        self.assertEqual(list(index.query("chr3", 0, 100)), [])
+        self.assertEqual(list(index.select([("chr1", 15, 15), ("chr1", 85, 200)])), [2, 3, 4])
+
+    def test_query_matches_scan(self):
+        random = np.random.RandomState(0)
+        starts = random.randint(0, 1000, 500)
+        ends = starts + random.randint(0, 100, 500)
+        chromosomes = np.where(random.rand(500) < 0.5, "chr1", "chr2")
+        index = IntervalIndex(chromosomes, starts, ends)
+        for start in range(0, 1100, 37):
+            expected = np.flatnonzero((chromosomes == "chr1") & (ends >= start) & (starts <= start + 50))
+            self.assertEqual(list(index.query("chr1", start, start + 50)), list(expected))
+
+
+class RegionTestCase(TestCase):
+
+    def setUp(self):
+        self.store = TrackStore().__enter__()
+        positions = np.arange(0, 1000, 10)
+        self.karyotype = Karyotype([KaryotypeChromosome("chr1", "1", 0, 1000, "blue"),
+                                    KaryotypeBand("chr1", "b1", "b1", 0, 500, "grey"),
+                                    KaryotypeBand("chr1", "b2", "b2", 500, 1000, "white"),
+                                    KaryotypeChromosome("chr2", "2", 0, 500, "red")])
+        self.histogram = Histogram(DataFrame(dict(chromosome="chr1", start=positions, end=positions + 9,
+                                                  value=positions)), 0.5, 0.8)
+        self.link = Link(DataFrame([["chr1", 100, 110, "chr1", 300, 310],
+                                    ["chr1", 100, 110, "chr2", 100, 110],
+                                    ["chr1", 150, 160, "chr1", 900, 910]]))
+        self.circos = Circos([self.karyotype], plots=[self.histogram], links=[self.link])
+
+    def tearDown(self):
+        self.store.__exit__(None, None, None)
+        self.store.close()
+
+    def test_region(self):
+        zoomed = self.circos.region("chr1", 95, 400)
+        karyotype = zoomed.karyotypes[0]
+        self.assertEqual(list(karyotype.ids), ["chr1", "b1"])
+        self.assertEqual(list(karyotype.starts), [95, 95])
+        self.assertEqual(list(karyotype.stops), [400, 400])
+        self.assertEqual(list(read_track(zoomed.plots[0].file)["start"]), list(range(90, 410, 10)))
+        self.assertEqual(len(read_track(zoomed.links[0].file)), 1)
+        self.assertEqual(len(read_track(self.circos.plots[0].file)), 100)
+        self.assertIsNot(zoomed.plots[0], self.histogram)
+
+    def test_regions(self):
+        zoomed = self.circos.regions([("chr1", 100, 200), ("chr1", 850, 950), ("chr2", 0, 200)])
+        self.assertEqual(list(zoomed.karyotypes[0].ids), ["chr1", "b1", "b2", "chr2"])
+        self.assertEqual(len(read_track(zoomed.plots[0].file)), 22)
+        self.assertEqual(len(read_track(zoomed.links[0].file)), 2)
+
+    def test_region_configuration(self):
+        configuration = self.circos.configuration
+        zoomed = self.circos.region("chr1", 0, 100)
+        self.assertNotEqual(zoomed.configuration, configuration)
+        self.assertEqual(self.circos.configuration, configuration)
+        self.assertIn(zoomed.plots[0].file.name, zoomed.configuration)
+        zoomed.ideogram.thickness = 5
+        self.assertIsNot(self.circos.configuration, configuration)
+
+    def test_region_is_independent(self):
+        self.histogram.rules.rules.append(Rule("var(value) > 500", color="blue"))
+        configuration = self.circos.configuration
+        zoomed = self.circos.region("chr1", 0, 100)
+        zoomed.plots[0].color = "red"
+        zoomed.plots[0].rules.rules.append(Rule("var(value) < 10", show=False))
+        zoomed.plots[0].axes.axes.append(Axis(0, 1))
+        self.assertIsNone(self.histogram.color)
+        self.assertEqual(len(self.histogram.rules), 1)
+        self.assertEqual(len(self.histogram.axes), 0)
+        self.assertIs(self.circos.configuration, configuration)
+        self.assertIn("color = red", zoomed.configuration)
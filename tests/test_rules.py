@@ -0,0 +1,85 @@
+from unittest import TestCase
+from Bio.Seq import Seq
+from Bio.SeqFeature import SeqFeature, FeatureLocation
+from Bio.SeqRecord import SeqRecord
+from pandas import DataFrame
+from pyrcos.functions import on, var
+from pyrcos.objects import Circos, Histogram, Karyotype, KaryotypeChromosome, Rule, Tile
+from pyrcos.rules import RuleError, apply_rules, compile_condition, track_columns
+from pyrcos.utils import seq_record_to_tiles
+from pyrcos.tracks import TrackStore, read_track
+
+
+class RulesTestCase(TestCase):
+
+    def setUp(self):
+        self.track = DataFrame(dict(chromosome=["chr1", "chr1", "chr2", "chr2"], start=[0, 100, 0, 100],
+                                    end=[99, 199, 99, 199], value=[0.1, 0.6, -1.0, 2.0]))
+        self.columns = track_columns(self.track)
+
+    def evaluate(self, condition):
+        return list(compile_condition(condition)(self.columns))
+
+    def test_conditions(self):
+        self.assertEqual(self.evaluate(var("value") + " > 0.5"), [False, True, False, True])
+        self.assertEqual(self.evaluate(on("chr2")), [False, False, True, True])
+        self.assertEqual(self.evaluate("on(chr1, 150, 300)"), [False, True, False, False])
+        self.assertEqual(self.evaluate('var(chr) eq "chr1" && !(var(value) < 0.5)'), [False, True, False, False])
+        self.assertEqual(self.evaluate("var(start) >= 1e2 or var(value) == -1"), [False, True, True, True])
+        self.assertEqual(self.evaluate("var(size) * 2 == 200 && var(value) / 2 < 1"), [True, True, True, False])
+        self.assertEqual(self.evaluate("1"), [True] * 4)
+        self.assertRaises(ValueError, compile_condition, "var(color) eq red")
+        self.assertRaises(ValueError, compile_condition, "rand() < 0.5")
+        self.assertRaises(ValueError, compile_condition, "var(value) >")
+
+    def test_apply_rules(self):
+        rules = [Rule(condition="var(value) < 0", show=False),
+                 Rule(condition=on("chr1"), color="red", flow="continue"),
+                 Rule(condition="var(value) > 0.5", color="blue"),
+                 Rule(condition="1", color="green")]
+        table = apply_rules(self.track, rules)
+        self.assertEqual(list(table["options"]), ["color=red,show=yes", "color=red,show=yes", "show=no",
+                                                  "color=blue,show=yes"])
+        self.assertEqual(list(table.columns), ["chromosome", "start", "end", "value", "options"])
+        rules[2].overwrite = True
+        self.assertEqual(list(apply_rules(self.track, rules)["options"]), ["color=red,show=yes", "color=blue,show=yes",
+                                                                           "show=no", "color=blue,show=yes"])
+        self.assertIn("overwrite = yes", rules[2].configuration)
+
+        self.track["options"] = ["z=1", "color=grey,z=2", "", "color=grey"]
+        table = apply_rules(self.track, [Rule(condition="var(value) > 0.5", color="blue")])
+        self.assertEqual(list(table["options"]), ["z=1", "z=2,color=blue,show=yes", "", "color=blue,show=yes"])
+
+        self.assertRaises(ValueError, apply_rules, self.track, [Rule(condition="1", flow="goto label")])
+
+    def test_plot_compile_rules(self):
+        karyotype = Karyotype([KaryotypeChromosome("chr1", "1", 0, 200, "blue"),
+                               KaryotypeChromosome("chr2", "2", 0, 200, "red")])
+        with TrackStore() as store:
+            histogram = Histogram(self.track, 0.5, 0.8, rules=[Rule(condition="var(value) > 0.5", color="blue")])
+            tile = Tile(self.track.iloc[:, 0:3], 0.3, 0.4, rules=[Rule(condition="rand() < 0.5", color="blue")])
+            circos = Circos(karyotype, plots=[histogram, tile], compile_rules=True)
+            self.assertEqual(len(histogram.rules), 0)
+            self.assertEqual(len(tile.rules), 1)
+            self.assertNotIn("<rules>", histogram.configuration)
+            self.assertEqual(list(read_track(histogram.file)["options"])[1], "color=blue,show=yes")
+            self.assertEqual(circos.compile_rules(), 0)
+        store.close()
+
+    def test_compile_rules_on_feature_tiles(self):
+        features = [SeqFeature(FeatureLocation(0, 10), type="gene"), SeqFeature(FeatureLocation(20, 40), type="gene")]
+        tiles = next(seq_record_to_tiles([SeqRecord(Seq("A" * 50), id="chr1", features=features)]))
+        with TrackStore() as store:
+            tile = Tile(tiles, 0.3, 0.4, rules=[Rule(condition="var(size) > 10", color="red")])
+            self.assertEqual(tile.compile_rules(), 1)
+            data = read_track(tile.file)
+            self.assertEqual(list(data.columns), ["chromosome", "start", "end", "value", "options"])
+            self.assertEqual(list(data["value"]), [1, 1])
+            self.assertEqual(list(data["options"]), ["", "color=red,show=yes"])
+
+            tile = Tile(tiles.iloc[:, 0:3], 0.3, 0.4, rules=[Rule(condition="var(value) > 0", color="red")])
+            self.assertEqual(tile.compile_rules(), 0)
+            broken = Histogram(tiles.assign(start="x"), 0.5, 0.6, rules=[Rule(condition="1", color="red")])
+            self.assertRaises(ValueError, broken.compile_rules)
+            self.assertRaises(RuleError, apply_rules, self.track, [Rule(condition="1", flow="goto label")])
+        store.close()
@@ -0,0 +1,104 @@
+from unittest import TestCase
+from pandas import DataFrame
+from pyrcos.objects import Circos, Heatmap, Highlight, Histogram, Karyotype, KaryotypeChromosome
+from pyrcos.tracks import TrackStore, track_hash
+import gc
+import numpy as np
+import os
+import threading
+
+
+class TrackStoreTestCase(TestCase):
+
+    def setUp(self):
+        self.track = DataFrame(dict(chromosome=["chr1", "chr1"], start=[1, 11], end=[10, 20], value=[0.5, 1.5]))
+
+    def test_track_hash(self):
+        self.assertEqual(track_hash(self.track), track_hash(self.track.copy()))
+        changed = self.track.copy()
+        changed.loc[1, "value"] = 2.5
+        self.assertNotEqual(track_hash(self.track), track_hash(changed))
+
+    def test_shared_files(self):
+        with TrackStore() as store:
+            histogram = Histogram(self.track, 0.5, 0.6)
+            heatmap = Heatmap(self.track.copy(), 0.6, 0.7)
+            highlight = Highlight(self.track, 0.7, 0.8)
+            other = Histogram(self.track.iloc[:1], 0.8, 0.9)
+
+        self.assertEqual(len(store), 2)
+        self.assertIs(histogram.file, heatmap.file)
+        self.assertIs(histogram.file, highlight.file)
+        self.assertNotEqual(histogram.file.name, other.file.name)
+        self.assertEqual(os.path.dirname(histogram.file.name), store.directory)
+        self.assertFalse(os.path.exists(histogram.file.name))
+        histogram.file.materialize()
+        with open(histogram.file.name) as fr:
+            self.assertEqual(fr.read(), "chr1\t1\t10\t0.5\nchr1\t11\t20\t1.5\n")
+        histogram.file.release()
+
+        directory = store.directory
+        store.close()
+        self.assertFalse(os.path.exists(directory))
+
+    def test_unused_files_are_forgotten(self):
+        with TrackStore() as store:
+            histogram = Histogram(self.track, 0.5, 0.6)
+            Histogram(self.track.iloc[:1], 0.6, 0.7)
+        gc.collect()
+        self.assertEqual(len(store), 1)
+        self.assertIs(store.add(self.track), histogram.file)
+        store.close()
+
+    def test_data_is_snapshot(self):
+        with TrackStore() as store:
+            histogram = Histogram(self.track, 0.5, 0.6)
+        self.track.loc[1, "value"] = 2.5
+        self.assertEqual(histogram.file.key, track_hash(histogram.file.data))
+        histogram.file.materialize()
+        with open(histogram.file.name) as fr:
+            self.assertEqual(fr.read(), "chr1\t1\t10\t0.5\nchr1\t11\t20\t1.5\n")
+        histogram.file.release()
+        self.assertIsNot(store.add(self.track), histogram.file)
+        store.close()
+
+    def test_active_store_per_thread(self):
+        stores = []
+        with TrackStore() as store:
+            thread = threading.Thread(target=lambda: stores.append(TrackStore.current()))
+            thread.start()
+            thread.join()
+            self.assertIs(TrackStore.current(), store)
+        self.assertIsNot(stores[0], store)
+        self.assertIsNot(TrackStore.current(), store)
+        store.close()
+
+    def test_structured_array(self):
+        track = np.array([(b"chr1", 1, 10, 0.5), (b"chr2", 11, 20, 1.5)],
+                         dtype=[("chromosome", "S4"), ("start", int), ("end", int), ("value", float)])
+        with TrackStore() as store:
+            histogram = Histogram(track, 0.5, 0.6)
+
+        histogram.file.materialize()
+        with open(histogram.file.name) as fr:
+            self.assertEqual(fr.read(), "chr1\t1\t10\t0.5\nchr2\t11\t20\t1.5\n")
+        histogram.file.release()
+        store.close()
+
+    def test_materialization(self):
+        with TrackStore(tmpfs=True) as store:
+            histogram = Histogram(self.track, 0.5, 0.6)
+            highlight = Highlight(self.track, 0.7, 0.8)
+            circos = Circos(Karyotype([KaryotypeChromosome("chr1", "1", 0, 100, "blue")]), plots=[histogram],
+                            highlights=[highlight])
+
+        if os.path.isdir("/dev/shm"):
+            self.assertTrue(store.directory.startswith("/dev/shm"))
+        files = circos.data_files()
+        self.assertEqual(len(files), 2)
+        with circos.workspace():
+            with circos.workspace():
+                self.assertTrue(all(os.path.isfile(f.name) for f in files))
+            self.assertTrue(all(os.path.isfile(f.name) for f in files))
+        self.assertFalse(any(os.path.exists(f.name) for f in files))
+        store.close()
@@ -1,8 +1,16 @@
 from unittest import TestCase
 from Bio import SeqIO
+from Bio.Seq import Seq
+from Bio.SeqFeature import SeqFeature, FeatureLocation
+from Bio.SeqRecord import SeqRecord
 from pyrcos.objects import KaryotypeChromosome, KaryotypeBand
-from pyrcos.utils import seq_records_to_karyotype
+from pyrcos.utils import seq_records_to_karyotype, seq_record_to_tiles, seq_records_to_feature_tables, \
+    iter_feature_tables, sequence_lengths, sequence_files_to_karyotype, extract_features, \
+    extracted_features_to_karyotype, extracted_features_to_tables, _record_chunks
+import gzip
 import os
+import shutil
+import tempfile
 
 CUR_DIR = os.path.dirname(__file__)
 
@@ -17,3 +25,130 @@ class UtilsTestCase(TestCase):
         karyotype = seq_records_to_karyotype(self.genbanks)
         self.assertTrue(all([isinstance(r, KaryotypeChromosome) for r in karyotype.rows[0:len(self.genbanks)]]))
         self.assertTrue(all([isinstance(r, KaryotypeBand) for r in karyotype.rows[len(self.genbanks):]]))
+
+
+class FeatureTablesTestCase(TestCase):
+
+    def setUp(self):
+        features = [SeqFeature(FeatureLocation(0, 10), type="gene"),
+                    SeqFeature(FeatureLocation(2, 8), type="CDS"),
+                    SeqFeature(FeatureLocation(20, 30), type="tRNA"),
+                    SeqFeature(FeatureLocation(40, 50), type="gene")]
+        self.records = [SeqRecord(Seq("A" * 100), id="chr1", name="chr1", features=features),
+                        SeqRecord(Seq("A" * 50), id="chr2", name="chr2", features=features[:1])]
+
+    def test_seq_record_to_tiles(self):
+        tracks = list(seq_record_to_tiles(self.records, feature_types=["gene", "tRNA"]))
+        self.assertEqual(len(tracks), 2)
+        self.assertEqual(list(tracks[0].columns), ["chromosome", "start", "end", "value", "options"])
+        self.assertEqual(list(tracks[0]["start"]), [1, 21, 41])
+        self.assertEqual(list(tracks[0]["end"]), [10, 30, 50])
+        self.assertEqual(list(tracks[1]["chromosome"]), ["chr2"])
+
+    def test_seq_records_to_feature_tables(self):
+        tables = seq_records_to_feature_tables(self.records, feature_types=["gene", "CDS", "rRNA"])
+        self.assertEqual(list(tables["gene"]["chromosome"]), ["chr1", "chr1", "chr2"])
+        self.assertEqual(list(tables["CDS"]["start"]), [3])
+        self.assertEqual(len(tables["rRNA"]), 0)
+
+        highlights = seq_records_to_feature_tables(self.records, feature_types=["gene"], kind="highlight")
+        self.assertEqual(list(highlights["gene"].columns), ["chromosome", "start", "end", "options"])
+
+    def test_iter_feature_tables(self):
+        tables = list(iter_feature_tables(self.records, feature_types=["gene"]))
+        self.assertEqual([len(t["gene"]) for t in tables], [2, 1])
+
+
+class SequenceFilesTestCase(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.records = [SeqRecord(Seq("ACGT" * length), id="contig%i.1" % i, name="contig%i" % i,
+                                  annotations={"molecule_type": "DNA"})
+                        for i, length in enumerate([250, 3, 40, 1])]
+        self.fasta = os.path.join(self.directory, "assembly.fna")
+        self.genbank = os.path.join(self.directory, "assembly.gbk")
+        SeqIO.write(self.records, self.fasta, "fasta")
+        SeqIO.write(self.records, self.genbank, "genbank")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_sequence_lengths(self):
+        expected = [(record.id, record.id, len(record)) for record in self.records]
+        self.assertEqual(list(sequence_lengths(self.fasta)), expected)
+        expected = [(record.id, record.name, len(record)) for record in self.records]
+        self.assertEqual(list(sequence_lengths(self.genbank)), expected)
+
+        compressed = os.path.join(self.directory, "assembly.data.gz")
+        with open(self.genbank, "rb") as source, gzip.open(compressed, "wb") as target:
+            shutil.copyfileobj(source, target)
+        self.assertEqual(list(sequence_lengths(compressed)), expected)
+
+    def test_sequence_files_to_karyotype(self):
+        karyotype = sequence_files_to_karyotype(self.genbank)
+        self.assertEqual(str(karyotype), str(seq_records_to_karyotype(self.records)))
+
+        karyotype = sequence_files_to_karyotype([self.fasta], min_length=100, color_map={"contig0.1": "red"})
+        self.assertEqual(list(karyotype.ids), ["contig0.1", "contig2.1", "other"])
+        self.assertEqual(list(karyotype.stops), [1000, 160, 16])
+        self.assertEqual(list(karyotype.colors)[0], "red")
+
+        karyotype = sequence_files_to_karyotype(self.fasta, min_length=100, small="drop")
+        self.assertEqual(list(karyotype.ids), ["contig0.1", "contig2.1"])
+
+
+class ExtractFeaturesTestCase(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        features = [SeqFeature(FeatureLocation(0, 10), type="gene"),
+                    SeqFeature(FeatureLocation(2, 8), type="CDS"),
+                    SeqFeature(FeatureLocation(40, 50), type="gene")]
+        self.records = [SeqRecord(Seq("A" * (100 + i)), id="chr%i.1" % i, name="chr%i" % i,
+                                  features=features[0:i + 1], annotations={"molecule_type": "DNA"})
+                        for i in range(4)]
+        self.paths = []
+        for i in range(0, 4, 2):
+            path = os.path.join(self.directory, "genome%i.gbk" % i)
+            SeqIO.write(self.records[i:i + 2], path, "genbank")
+            self.paths.append(path)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_extract_features(self):
+        extra = SeqRecord(Seq("A" * 20), id="extra", name="extra", features=[SeqFeature(FeatureLocation(5, 6),
+                                                                                         type="CDS")])
+        records = self.records + [extra]
+        expected = seq_records_to_feature_tables(records, feature_types=["gene", "CDS"])
+        for max_workers in (1, 2):
+            features = extract_features(self.paths + [extra], feature_types=["gene", "CDS"], max_workers=max_workers)
+            self.assertEqual(list(features.ids), [record.id for record in records])
+            self.assertEqual(list(features.records), [0, 1, 1, 2, 2, 2, 3, 3, 3, 4])
+            tables = extracted_features_to_tables(features, feature_types=["gene", "CDS"])
+            for feature_type in ("gene", "CDS"):
+                self.assertEqual(tables[feature_type].values.tolist(), expected[feature_type].values.tolist())
+
+            chunked = extract_features(self.paths + [extra], feature_types=["gene", "CDS"], max_workers=max_workers,
+                                       chunk_size=1)
+            for name in features._fields:
+                self.assertEqual(getattr(chunked, name).tolist(), getattr(features, name).tolist())
+
+        karyotype = extracted_features_to_karyotype(features)
+        self.assertEqual(str(karyotype), str(seq_records_to_karyotype(records)))
+        self.assertEqual(len(extract_features([]).ids), 0)
+
+    def test_record_chunks(self):
+        path = os.path.join(self.directory, "genome.gbk")
+        SeqIO.write(self.records, path, "genbank")
+        chunks = list(_record_chunks(path, "genbank", 1))
+        self.assertEqual(len(chunks), 4)
+        self.assertEqual(chunks[-1][1], os.path.getsize(path))
+        self.assertTrue(all(end == start for (_, end), (start, _) in zip(chunks, chunks[1:])))
+        self.assertEqual(len(list(_record_chunks(path, "genbank", os.path.getsize(path)))), 1)
+        self.assertEqual(list(_record_chunks(path, "embl", 1)), [(None, None)])
+
+        features = extract_features([path], feature_types=["gene", "CDS"], max_workers=2, chunk_size=1)
+        self.assertEqual(list(features.ids), [record.id for record in self.records])
+        self.assertEqual(list(features.records), [0, 1, 1, 2, 2, 2, 3, 3, 3])